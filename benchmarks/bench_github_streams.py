@@ -0,0 +1,70 @@
+"""Compares the buffered github streams with the previous print-per-message streams.
+
+The streams write into a pipe that is drained by a background thread, like the runner reading the step output:
+    python benchmarks/bench_github_streams.py
+"""
+from os import close, fdopen, path, pipe, read
+from threading import Thread
+from time import perf_counter
+from typing import Callable, TextIO
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+import lib.logger_gh_actions as logger_gh_actions  # noqa: E402
+from lib.logger import LOG_LEVEL, Logger, LogStreamBase, StreamHandler  # noqa: E402
+
+
+class LegacyGithubErrorStream(LogStreamBase):
+    def __init__(self, target: TextIO):
+        super().__init__(init_message=False)
+        self.target = target
+
+    def write(self, message: str) -> int:
+        print(f"::error::{message}", file=self.target, flush=True, end="")
+        return len(message)
+
+
+def open_drained_pipe() -> tuple[TextIO, Thread]:
+    read_fd, write_fd = pipe()
+
+    def drain() -> None:
+        while read(read_fd, 1 << 16):
+            pass
+        close(read_fd)
+
+    t_thread = Thread(target=drain, daemon=True)
+    t_thread.start()
+    return fdopen(write_fd, "w"), t_thread
+
+
+def measure(create_stream: Callable[[TextIO], LogStreamBase], records: int) -> float:
+    target, drain_thread = open_drained_pipe()
+    logger_gh_actions.stderr = target  # type: ignore
+    handler = StreamHandler(create_stream(target), LOG_LEVEL.ERROR)
+    logger = Logger("bench")
+
+    t_start = perf_counter()
+    for i in range(records):
+        logger.error("record %d of the benchmark", i)
+    logger_gh_actions.flush_github_streams()
+    t_elapsed = perf_counter() - t_start
+
+    handler.detach()
+    target.close()
+    drain_thread.join()
+    return records / t_elapsed
+
+
+def main(records: int = 50000) -> dict[str, float]:
+    legacy = measure(LegacyGithubErrorStream, records)
+    buffered = measure(lambda _: logger_gh_actions.GithubErrorStream(), records)
+    logger_gh_actions.stderr = sys.stderr  # type: ignore
+    return {"legacy_records_per_s": legacy, "buffered_records_per_s": buffered}
+
+
+if __name__ == "__main__":
+    t_result = main()
+    print(f"legacy:   {t_result['legacy_records_per_s']:12.0f} records/s")
+    print(f"buffered: {t_result['buffered_records_per_s']:12.0f} records/s "
+          f"({t_result['buffered_records_per_s'] / t_result['legacy_records_per_s']:.2f}x)")
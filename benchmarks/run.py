@@ -0,0 +1,227 @@
+"""Benchmark suite for the logger, the github storage managers and the input parser.
+
+Runs offline against temporary files:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare results.json [--threshold 0.2]
+
+With --compare every metric is compared with the stored baseline and the exit code is 1
+if one got worse by more than threshold (relative).
+"""
+from __future__ import annotations
+from argparse import ArgumentParser
+from json import dump, load
+from os import environ, makedirs, path
+from platform import platform, python_version
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+import bench_github_streams  # noqa: E402
+import lib.logger_gh_actions as logger_gh_actions  # noqa: E402
+from lib.github_storage_manager import GithubENVManager, GithubOutputManager, batch_writes  # noqa: E402
+from lib.logger import DURABILITY, LOG_LEVEL, CrashLogFile, FileHandler, Logger, LogFile, LogFileOnDemand, LogStreamBase, StreamHandler  # noqa: E402
+
+
+Result = dict[str, Any]
+
+
+def _result(value: float, unit: str, higher_is_better: bool) -> Result:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def _records_per_s(handler: FileHandler | StreamHandler, records: int) -> float:
+    logger = Logger("bench")
+    t_start = perf_counter()
+    for i in range(records):
+        logger.info("record %d of the benchmark", i)
+    handler.detach().close()
+    return records / (perf_counter() - t_start)
+
+
+class _NullStream(LogStreamBase):
+    def __init__(self):
+        super().__init__(init_message=False)
+
+    def write(self, message: str) -> int:
+        return len(message)
+
+
+# MARK: logger
+def bench_logger(tmp: str, records: int) -> dict[str, Result]:
+    results: dict[str, Result] = {}
+    for durability in DURABILITY:
+        t_records = records // 10 if durability == DURABILITY.ALWAYS else records
+        t_file = LogFile(path.join(tmp, f"log_file_{durability.name}.log"), durability=durability)
+        results[f"logger.LogFile.{durability.name}"] = _result(_records_per_s(FileHandler(t_file, LOG_LEVEL.DEBUG), t_records), "records/s", True)
+
+    t_on_demand = LogFileOnDemand(path.join(tmp, "log_file_on_demand.log"), durability=DURABILITY.ON_CLOSE)
+    results["logger.LogFileOnDemand.ON_CLOSE"] = _result(_records_per_s(FileHandler(t_on_demand, LOG_LEVEL.DEBUG), records), "records/s", True)
+
+    t_crash_log = CrashLogFile(path.join(tmp, "crash_"), ".log", durability=DURABILITY.ON_CLOSE)
+    results["logger.CrashLogFile.ON_CLOSE"] = _result(_records_per_s(FileHandler(t_crash_log, LOG_LEVEL.DEBUG), records), "records/s", True)
+
+    t_streams = bench_github_streams.main(records)
+    results["logger.GithubErrorStream.legacy"] = _result(t_streams["legacy_records_per_s"], "records/s", True)
+    results["logger.GithubErrorStream"] = _result(t_streams["buffered_records_per_s"], "records/s", True)
+
+    t_handler = StreamHandler(_NullStream(), LOG_LEVEL.INFO)
+    logger = Logger("bench")
+    t_start = perf_counter()
+    for i in range(records * 10):
+        logger.debug("disabled record %d", i)
+    results["logger.disabled_debug_call"] = _result((perf_counter() - t_start) / (records * 10) * 1e9, "ns/call", False)
+    t_handler.detach()
+    return results
+
+
+# MARK: storage managers
+class _BenchENVStorage(GithubENVManager):
+    BENCH_VALUE: str
+    BENCH_NUMBER: int
+
+
+class _BenchOutputStorage(GithubOutputManager):
+    bench_value: str
+    bench_number: int
+
+
+def _per_op(operations: int, op: Callable[[int], Any]) -> float:
+    t_start = perf_counter()
+    for i in range(operations):
+        op(i)
+    return (perf_counter() - t_start) / operations * 1e6
+
+
+def bench_storage_managers(tmp: str, operations: int) -> dict[str, Result]:
+    environ["GITHUB_ENV"] = path.join(tmp, "github_env")
+    environ["GITHUB_OUTPUT"] = path.join(tmp, "github_output")
+    environ["BENCH_VALUE"] = "value"
+    environ["BENCH_NUMBER"] = "1"
+    _BenchOutputStorage.bench_value = "value"
+
+    def set_output(i: int) -> None:
+        _BenchOutputStorage.bench_number = i
+
+    def set_env(i: int) -> None:
+        _BenchENVStorage.BENCH_NUMBER = i
+
+    results: dict[str, Result] = {
+        "storage.ENVManager.get": _result(_per_op(operations, lambda i: _BenchENVStorage.BENCH_VALUE), "us/op", False),
+        "storage.ENVManager.set": _result(_per_op(operations, set_env), "us/op", False),
+        "storage.ENVManager.set_get": _result(_per_op(operations, lambda i: (set_env(i), _BenchENVStorage.BENCH_NUMBER)), "us/op", False),
+        "storage.OutputManager.get": _result(_per_op(operations, lambda i: _BenchOutputStorage.bench_value), "us/op", False),
+        "storage.OutputManager.set": _result(_per_op(operations, set_output), "us/op", False),
+    }
+    with batch_writes():
+        results["storage.OutputManager.set_batched"] = _result(_per_op(operations, set_output), "us/op", False)
+    return results
+
+
+# MARK: input parser
+def _set_inputs(tmp: str, entries: int) -> None:
+    makedirs(t_data := path.join(tmp, "data"), exist_ok=True)
+    with open(t_input_file := path.join(tmp, "main.py"), "w") as f:
+        f.write("print('hello')\n")
+    with open(t_data_file := path.join(t_data, "asset.bin"), "w") as f:
+        f.write("data")
+    with open(t_requirements := path.join(tmp, "requirements.txt"), "w") as f:
+        f.write("\n".join(f"package{i}=={i}.0" for i in range(min(entries, 1000))))
+    environ.update({
+        "INPUT_PYTHON_REQUIREMENTS_FILE_PATH": t_requirements,
+        "INPUT_PYTHON_VERSION": "3.12",
+        "INPUT_INPUT_FILE_PATH": t_input_file,
+        "INPUT_ONEFILE": "true",
+        "INPUT_NO_CONSOLE": "false",
+        "INPUT_OUTPUT_NAME": "",
+        "INPUT_OUTPUT_PATH": path.join(tmp, "dist"),
+        "INPUT_ICON_PATH": "",
+        "INPUT_ADDITIONAL_DATA": "\n".join(f"{t_data_file};target{i}" for i in range(entries)),
+        "INPUT_PATHS": "\n".join(t_data for _ in range(entries)),
+        "INPUT_HIDDEN_IMPORTS": "\n".join(f"module{i}" for i in range(entries)),
+        "INPUT_EXCLUDE_MODULES": "\n".join(f"excluded{i}" for i in range(entries)),
+        "INPUT_INCREMENTAL": "false",
+        "INPUT_IMPORT_ANALYSIS": "off",
+        "INPUT_REPRODUCIBLE": "false",
+        "INPUT_OPTIMIZE": "0",
+        "INPUT_STRIP": "false",
+        "INPUT_UPX": "false",
+        "INPUT_UPX_EXCLUDE": "",
+        "INPUT_ONEFILE_COMPRESSION_LEVEL": "",
+        "INPUT_ADDITIONAL_ARGUMENTS": "",
+        "TIMING_FILE_PATH": "",
+        "BUILD_MANIFEST_FILE_PATH": "",
+        "SPEC_FILE_PATH": path.join(tmp, "pyinstaller_action.spec"),
+        "DATA_STAGING_PATH": path.join(tmp, "staged_data"),
+        "DATA_STAGING_PLAN_FILE_PATH": path.join(tmp, "staged_data.json"),
+    })
+
+
+def bench_input_parser(tmp: str, sizes: list[int]) -> dict[str, Result]:
+    import input_parser
+
+    environ["GITHUB_ENV"] = path.join(tmp, "github_env")
+    environ["GITHUB_OUTPUT"] = path.join(tmp, "github_output")
+    input_parser.logger = Logger("bench")
+    t_handler = StreamHandler(_NullStream(), LOG_LEVEL.DEBUG)
+
+    results: dict[str, Result] = {}
+    for entries in sizes:
+        _set_inputs(tmp, entries)
+        t_start = perf_counter()
+        with batch_writes():
+            input_parser.validate_inputs()
+        results[f"input_parser.validate_inputs.{entries}"] = _result((perf_counter() - t_start) * 1e3, "ms", False)
+    t_handler.detach()
+    return results
+
+
+# MARK: main
+def run(quick: bool) -> dict[str, Any]:
+    records = 2000 if quick else 20000
+    sizes = [1, 100, 1000] if quick else [1, 100, 1000, 10000, 30000]
+    results: dict[str, Result] = {}
+    with TemporaryDirectory() as tmp:
+        results.update(bench_logger(tmp, records))
+        results.update(bench_storage_managers(tmp, records))
+        results.update(bench_input_parser(tmp, sizes))
+    logger_gh_actions.flush_github_streams()
+    return {"python": python_version(), "platform": platform(), "results": results}
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> bool:
+    """Print the change of every metric and return False if one regressed by more than threshold."""
+    t_ok = True
+    for name, result in current["results"].items():
+        if (t_base := baseline["results"].get(name)) is None or t_base["value"] == 0 or result["value"] == 0:
+            print(f"{name:45} {result['value']:14.2f} {result['unit']:10} (no baseline)")
+            continue
+        t_change = result["value"] / t_base["value"] if result["higher_is_better"] else t_base["value"] / result["value"]
+        t_regressed = t_change < 1 - threshold
+        t_ok &= not t_regressed
+        print(f"{name:45} {result['value']:14.2f} {result['unit']:10} {t_change:6.2f}x{'  REGRESSION' if t_regressed else ''}")
+    return t_ok
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the results as json to this file")
+    parser.add_argument("--compare", help="baseline json file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression for --compare (default 0.2)")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    args = parser.parse_args()
+
+    t_current = run(args.quick)
+    if args.output:
+        with open(args.output, "w") as f:
+            dump(t_current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            t_baseline = load(f)
+        sys.exit(0 if compare(t_current, t_baseline, args.threshold) else 1)
+
+    for name, result in t_current["results"].items():
+        print(f"{name:45} {result['value']:14.2f} {result['unit']}")
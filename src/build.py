@@ -0,0 +1,205 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import cpu_count, environ, makedirs, name as os_name, path, replace
+from shlex import split
+from shutil import copy2, copytree, rmtree
+from subprocess import PIPE, STDOUT, list2cmdline, run
+from sys import exc_info, executable, stderr
+from traceback import format_exc
+from typing import Any
+from lib.github_storage_manager import GithubENVManager, GithubOutputManager, batch_writes
+
+from lib.logger_gh_actions import end_log_group, flush_github_streams, start_log_group, use_std_config
+from lib.logger import Logger, get_spans
+from data_staging import read_staging_plan, stage_data
+from import_graph import installed_modules
+from spec_file import PHASE_ENV, TARGET_ENV, read_spec_constants
+from timing import append_spans
+
+
+def print_to_err(x: str) -> None:
+    return print(x, file=stderr)
+
+
+class ENVStorage(GithubENVManager):
+    SPEC_FILE_PATH: str
+    BUILD_PATH: str
+    CACHE_KEY: str
+    ADDITIONAL_ARGUMENTS: str
+    TIMING_FILE_PATH: str
+    BUILD_SOURCE_DATE_EPOCH: str
+    BUILD_PYTHONHASHSEED: str
+    EXCLUDE_CANDIDATES: str
+    DATA_STAGING_PLAN_FILE_PATH: str
+
+
+class OutputStorage(GithubOutputManager):
+    suggested_exclude_modules: str
+
+
+logger: Logger
+
+
+WORKPATH_DIR = "pyinstaller_install_dir"
+CACHE_DIR = "pyinstaller_cache_dir"
+WORKER_CACHE_DIR = "pyinstaller_worker_cache_dir"
+ANALYSIS_WORKPATH = "pyinstaller_analysis_dir"
+
+
+class BuildError(Exception):
+    def __init__(self, msg: str = 'pyinstaller failed', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
+def prepare_build_path(build_path: str, cache_key: str) -> None:
+    """Keep the restored workpath and pyinstaller cache if they were built with the same cache key, start empty otherwise."""
+    t_key_file = path.join(build_path, "cache_key")
+    cached_key = ""
+    if path.isfile(t_key_file):
+        with open(t_key_file, "r", encoding="utf-8") as f:
+            cached_key = f.read().strip()
+    if cached_key == cache_key:
+        logger.debug("Reuse build path %s", build_path)
+        return
+
+    logger.debug("Reset build path %s, cached key %s differs", build_path, cached_key or "missing")
+    rmtree(build_path, ignore_errors=True)
+    makedirs(path.join(build_path, CACHE_DIR))
+    with open(t_key_file, "w", encoding="utf-8") as f:
+        f.write(cache_key)
+
+
+def load_spec(spec_file: str) -> tuple[list[str], str]:
+    """Return the target names and the dist path of a generated spec."""
+    with open(spec_file, "r", encoding="utf-8") as f:
+        constants = read_spec_constants(f.read(), ("TARGETS", "DISTPATH"))
+    return list(constants["TARGETS"]), constants["DISTPATH"]
+
+
+def pyinstaller_command(spec_file: str, dist_path: str, work_path: str, additional_arguments: str) -> str | list[str]:
+    command = [executable, "-m", "PyInstaller", "--noconfirm", "--distpath", dist_path, "--workpath", work_path]
+    if os_name == "nt":
+        # additional-arguments are written for the windows command line, pass them on as they are
+        return f"{list2cmdline(command)} {additional_arguments} {list2cmdline([spec_file])}"
+    return command + split(additional_arguments) + [spec_file]
+
+
+def run_pyinstaller(span: str, spec_file: str, dist_path: str, work_path: str, cache_dir: str, additional_arguments: str, env: dict[str, str]) -> tuple[int, str]:
+    command = pyinstaller_command(spec_file, dist_path, work_path, additional_arguments)
+    with logger.span(span):
+        result = run(command, stdout=PIPE, stderr=STDOUT, env={**environ, "PYINSTALLER_CONFIG_DIR": cache_dir, **env},
+                     text=True, encoding="utf-8", errors="replace")
+    return result.returncode, result.stdout
+
+
+def analysis_toc(work_path: str, spec_file: str, index: int) -> str:
+    # pyinstaller keeps its files in a subdirectory named after the spec
+    return path.join(work_path, path.splitext(path.basename(spec_file))[0], f"Analysis-{index:02d}.toc")
+
+
+def prepare_bundling(spec_file: str, build_path: str, targets: list[str]) -> None:
+    """Give every target a workpath holding the result of the shared analysis and a copy of the pyinstaller cache,
+    parallel processes must not write the same cached binary."""
+    for index, name in enumerate(targets):
+        t_toc = analysis_toc(path.join(build_path, WORKPATH_DIR, name), spec_file, index)
+        makedirs(path.dirname(t_toc), exist_ok=True)
+        # copy2 keeps the modification time pyinstaller compares the inputs with
+        copy2(analysis_toc(path.join(build_path, ANALYSIS_WORKPATH), spec_file, index), t_toc)
+        rmtree(t_cache := path.join(build_path, WORKER_CACHE_DIR, name), ignore_errors=True)
+        copytree(path.join(build_path, CACHE_DIR), t_cache)
+
+
+def keep_worker_cache(build_path: str, name: str) -> None:
+    """Keep the cache of one target as the pyinstaller cache restored by the next run and drop the others."""
+    rmtree(t_cache := path.join(build_path, CACHE_DIR), ignore_errors=True)
+    replace(path.join(build_path, WORKER_CACHE_DIR, name), t_cache)
+    rmtree(path.join(build_path, WORKER_CACHE_DIR), ignore_errors=True)
+
+
+def stage_additional_data(plan_file: str) -> None:
+    """Stage the additional data as planned by the input parser, pyinstaller bundles the staged tree."""
+    with logger.span("stage data"):
+        staging_path, plan = read_staging_plan(plan_file)
+        staging = stage_data(plan, staging_path)
+    logger.debug("Staged %s data files in %s: %s linked, %s copied, %s deduplicated",
+                 len(plan), staging_path, staging.linked, staging.copied, staging.deduplicated)
+
+
+def suggest_exclude_modules(exclude_candidates: list[str]) -> None:
+    """Report the exclude module candidates of the import analysis that pyinstaller can find, the others are never bundled anyway."""
+    exclude_modules = installed_modules(exclude_candidates)
+    if len(exclude_modules) > 0:
+        logger.info("Suggested exclude modules, installed but neither imported by the input file and its local modules nor required directly, check your dependencies do not import them: %s", ", ".join(exclude_modules))
+    OutputStorage.suggested_exclude_modules = "\n".join(exclude_modules)
+
+
+def build_env() -> dict[str, str]:
+    """Environment of the reproducible mode for the pyinstaller processes, empty variables are left unset."""
+    t_env = {"SOURCE_DATE_EPOCH": ENVStorage.BUILD_SOURCE_DATE_EPOCH, "PYTHONHASHSEED": ENVStorage.BUILD_PYTHONHASHSEED}
+    return {k: v for k, v in t_env.items() if v != ""}
+
+
+def _report(name: str, returncode: int, output: str) -> bool:
+    start_log_group(f"pyinstaller {name}")
+    print(output, end="" if output.endswith("\n") else "\n", flush=True)
+    end_log_group()
+    if returncode != 0:
+        logger.error("pyinstaller failed for %s with exit code %s", name, returncode)
+    return returncode == 0
+
+
+def build():
+    ENVStorage.load()
+
+    build_path = path.abspath(ENVStorage.BUILD_PATH)
+    prepare_build_path(build_path, ENVStorage.CACHE_KEY)
+    spec_file = path.abspath(ENVStorage.SPEC_FILE_PATH)
+    targets, dist_path = load_spec(spec_file)
+    env = build_env()
+    suggest_exclude_modules(ENVStorage.EXCLUDE_CANDIDATES.split())
+    if ENVStorage.DATA_STAGING_PLAN_FILE_PATH != "":
+        stage_additional_data(ENVStorage.DATA_STAGING_PLAN_FILE_PATH)
+
+    t_failed: list[str] = []
+    if len(targets) == 1:
+        if not _report(targets[0], *run_pyinstaller(f"build {targets[0]}", spec_file, dist_path, path.join(build_path, WORKPATH_DIR, targets[0]),
+                                                    path.join(build_path, CACHE_DIR), ENVStorage.ADDITIONAL_ARGUMENTS, {**env, TARGET_ENV: targets[0]})):
+            t_failed.append(targets[0])
+    elif len(targets) > 1:
+        # one process analyzes all targets, pyinstaller reuses its module graph between the analyses of a process
+        if not _report("analysis", *run_pyinstaller("analyze", spec_file, dist_path, path.join(build_path, ANALYSIS_WORKPATH),
+                                                    path.join(build_path, CACHE_DIR), ENVStorage.ADDITIONAL_ARGUMENTS, {**env, PHASE_ENV: "analyze"})):
+            t_failed.append("analysis")
+        else:
+            prepare_bundling(spec_file, build_path, targets)
+            t_workers = min(len(targets), cpu_count() or 1)
+            logger.debug("Bundle %s targets with %s parallel pyinstaller processes", len(targets), t_workers)
+            with ThreadPoolExecutor(max_workers=t_workers) as pool:
+                futures = {pool.submit(run_pyinstaller, f"build {t}", spec_file, dist_path, path.join(build_path, WORKPATH_DIR, t),
+                                       path.join(build_path, WORKER_CACHE_DIR, t), ENVStorage.ADDITIONAL_ARGUMENTS, {**env, TARGET_ENV: t}): t for t in targets}
+                for future in as_completed(futures):
+                    if not _report(futures[future], *future.result()):
+                        t_failed.append(futures[future])
+            keep_worker_cache(build_path, targets[0])
+
+    if ENVStorage.TIMING_FILE_PATH != "":
+        append_spans(ENVStorage.TIMING_FILE_PATH, get_spans(), "build")
+    if len(t_failed) > 0:
+        raise BuildError(f"pyinstaller failed for {', '.join(t_failed)}!")
+
+
+if __name__ == "__main__":
+    try:
+        use_std_config()
+        logger = Logger("")
+        with batch_writes():
+            build()
+    except BaseException as e:
+        exc = format_exc()
+        exc_type, exc_obj, exc_tb = exc_info()
+        ln = exc_tb.tb_lineno if exc_tb is not None else -1
+        fname = path.split(exc_tb.tb_frame.f_code.co_filename)[1] if exc_tb is not None else ""
+        # gets primted differently therefore not per logger
+        flush_github_streams()
+        print_to_err(f"::error title={type(e).__name__}::{type(e).__name__}: {str(e)}\n{exc}")
+        exit(1)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from json import dump, load
+from os import link, makedirs, path, walk
+from shutil import copy2, rmtree
+from typing import NamedTuple, Optional
+
+from file_hash import hash_files
+from input_schema import InputError, StatCache
+
+
+class DataFile(NamedTuple):
+    source: str
+    target: str
+    """path of the file inside the bundle, / separated"""
+
+
+class StagedFile(NamedTuple):
+    source: str
+    target: str
+    key: str
+    """content key, staged files with equal keys have equal content"""
+
+
+class StagingResult(NamedTuple):
+    linked: int
+    copied: int
+    """files copied because the staging path cannot hardlink them, e.g. on another drive"""
+    deduplicated: int
+    """files with the content of an already staged file, linked to that file"""
+
+
+def _bundle_path(target: str, name: str) -> str:
+    t_path = path.normpath(path.join(target, name)).replace("\\", "/")
+    if path.isabs(t_path) or t_path == ".." or t_path.startswith("../"):
+        raise InputError(f"additional-data target {target} is outside of the bundle!")
+    return t_path
+
+
+def data_files(additional_data: list[tuple[str, str]]) -> list[DataFile]:
+    """Expand the additional-data entries to single files with the path pyinstaller gives them in the bundle."""
+    files: list[DataFile] = []
+    for ad_path, ad_target in additional_data:
+        if not path.isdir(ad_path):
+            files.append(DataFile(ad_path, _bundle_path(ad_target, path.basename(ad_path))))
+            continue
+        for root, dirs, t_files in walk(ad_path):
+            dirs.sort()
+            for file in sorted(t_files):
+                t_file = path.join(root, file)
+                files.append(DataFile(t_file, _bundle_path(ad_target, path.relpath(t_file, ad_path))))
+    return files
+
+
+def content_keys(sources: list[str], stat_cache: StatCache, hashes: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Key every source by its content. Without hashes of all sources, a file whose size no other file has is unique
+    without reading it and only files with colliding sizes are hashed."""
+    stat_cache.prefetch(sources)
+    t_by_size: dict[int, list[str]] = {}
+    for source in sources:
+        if (st := stat_cache.stat(source)) is None:
+            raise InputError(f"additional-data {source} does not exist!")
+        t_by_size.setdefault(st.st_size, []).append(source)
+    if hashes is None:
+        hashes = hash_files([s for group in t_by_size.values() if len(group) > 1 for s in group])
+    return {s: f"sha256:{hashes[s]}" if s in hashes else f"file:{path.normcase(path.abspath(s))}" for s in sources}
+
+
+def plan_staging(files: list[DataFile], hashes: Optional[dict[str, str]] = None) -> list[StagedFile]:
+    """One staged file per bundle path. hashes are reused as content keys where they cover all sources,
+    e.g. the ones already computed for the build manifest."""
+    keys = content_keys(list(dict.fromkeys(f.source for f in files)), StatCache(), hashes)
+    t_targets: dict[str, DataFile] = {}
+    for file in files:
+        if (other := t_targets.setdefault(path.normcase(file.target), file)) is not file and keys[other.source] != keys[file.source]:
+            raise InputError(f"additional-data {other.source} and {file.source} are both bundled as {file.target}!")
+    return [StagedFile(f.source, f.target, keys[f.source]) for f in t_targets.values()]
+
+
+def write_staging_plan(plan_file: str, staging_path: str, plan: list[StagedFile]) -> str:
+    with open(plan_file := path.abspath(plan_file), "w", encoding="utf-8") as f:
+        dump({"staging_path": staging_path, "files": plan}, f)
+    return plan_file
+
+
+def read_staging_plan(plan_file: str) -> tuple[str, list[StagedFile]]:
+    with open(plan_file, "r", encoding="utf-8") as f:
+        plan = load(f)
+    return plan["staging_path"], [StagedFile(*file) for file in plan["files"]]
+
+
+def _link_or_copy(source: str, target: str) -> bool:
+    try:
+        link(source, target)
+        return True
+    except OSError:
+        # another drive or a file system without hardlinks
+        copy2(source, target)
+        return False
+
+
+def stage_data(plan: list[StagedFile], staging_path: str) -> StagingResult:
+    """Build the bundle layout of the additional data below staging_path, so pyinstaller gets a single data root.
+    Files are hardlinked instead of copied where possible and files with equal content share one staged file."""
+    rmtree(staging_path, ignore_errors=True)
+    makedirs(staging_path)
+
+    staged: dict[str, str] = {}
+    t_dirs = {staging_path}
+    linked = copied = deduplicated = 0
+    for file in plan:
+        t_staged = path.join(staging_path, *file.target.split("/"))
+        if (t_dir := path.dirname(t_staged)) not in t_dirs:
+            makedirs(t_dir, exist_ok=True)
+            t_dirs.add(t_dir)
+        if (t_first := staged.get(file.key)) is not None:
+            # the first staged file is on the staging drive, linking to it works even when its source had to be copied
+            _link_or_copy(t_first, t_staged)
+            deduplicated += 1
+            continue
+        if _link_or_copy(file.source, t_staged):
+            linked += 1
+        else:
+            copied += 1
+        staged[file.key] = t_staged
+    return StagingResult(linked, copied, deduplicated)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+from hashlib import sha256
+from os import path, utime, walk
+from sys import exc_info, stderr
+from traceback import format_exc
+from typing import Any
+from lib.github_storage_manager import GithubENVManager, GithubOutputManager, batch_writes
+
+from lib.logger_gh_actions import flush_github_streams, use_std_config
+from lib.logger import Logger
+from file_hash import hash_files
+
+
+def print_to_err(x: str) -> None:
+    return print(x, file=stderr)
+
+
+class ENVStorage(GithubENVManager):
+    DIST_PATH: str
+    DIST_MANIFEST_FILE_PATH: str
+    REPRODUCIBLE: bool
+    BUILD_SOURCE_DATE_EPOCH: str
+
+
+class OutputStorage(GithubOutputManager):
+    dist_manifest_file_path: str
+    dist_digest: str
+    dist_file_count: int
+
+
+logger: Logger
+
+
+class DistError(Exception):
+    def __init__(self, msg: str = 'invalid dist directory', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
+def dist_files(dist_path: str) -> list[str]:
+    """All files below dist_path, ordered by their relative path with / separators."""
+    files: list[str] = []
+    for root, dirs, t_files in walk(dist_path):
+        files.extend(path.join(root, f) for f in t_files)
+    return sorted(files, key=lambda f: _relative(f, dist_path))
+
+
+def _relative(file: str, dist_path: str) -> str:
+    return path.relpath(file, dist_path).replace("\\", "/")
+
+
+def normalize_mtimes(dist_path: str, files: list[str], epoch: int) -> None:
+    for file in files:
+        utime(file, (epoch, epoch))
+    for root, dirs, _ in walk(dist_path, topdown=False):
+        for d in dirs:
+            utime(path.join(root, d), (epoch, epoch))
+    utime(dist_path, (epoch, epoch))
+
+
+def write_dist_manifest(dist_path: str, files: list[str], manifest_file: str) -> str:
+    """Write the sha256 of every file in sha256sum format and return the digest of the manifest, which identifies the whole dist directory."""
+    t_hashes = hash_files(files)
+    manifest = "".join(f"{t_hashes[f]}  {_relative(f, dist_path)}\n" for f in files)
+    with open(manifest_file, "w", encoding="utf-8", newline="\n") as f:
+        f.write(manifest)
+    return sha256(manifest.encode()).hexdigest()
+
+
+def create_dist_manifest():
+    ENVStorage.load()
+
+    dist_path = path.abspath(ENVStorage.DIST_PATH)
+    if len(files := dist_files(dist_path)) == 0:
+        raise DistError(f"dist directory {dist_path} contains no files!")
+
+    if ENVStorage.REPRODUCIBLE:
+        if not (t_epoch := ENVStorage.BUILD_SOURCE_DATE_EPOCH).isdigit():
+            raise DistError(f"reproducible builds need BUILD_SOURCE_DATE_EPOCH as unix timestamp, got {t_epoch or 'nothing'}!")
+        normalize_mtimes(dist_path, files, int(t_epoch))
+        logger.debug("Set the modification time of %s files to %s", len(files), t_epoch)
+
+    manifest_file = path.abspath(ENVStorage.DIST_MANIFEST_FILE_PATH)
+    dist_digest = write_dist_manifest(dist_path, files, manifest_file)
+
+    logger.debug("Use dist manifest: %s", manifest_file)
+    logger.debug("Use dist digest: %s", dist_digest)
+
+    OutputStorage.dist_manifest_file_path = manifest_file
+    OutputStorage.dist_digest = dist_digest
+    OutputStorage.dist_file_count = len(files)
+
+
+if __name__ == "__main__":
+    try:
+        use_std_config()
+        logger = Logger("")
+        with batch_writes():
+            create_dist_manifest()
+    except BaseException as e:
+        exc = format_exc()
+        exc_type, exc_obj, exc_tb = exc_info()
+        ln = exc_tb.tb_lineno if exc_tb is not None else -1
+        fname = path.split(exc_tb.tb_frame.f_code.co_filename)[1] if exc_tb is not None else ""
+        # gets primted differently therefore not per logger
+        flush_github_streams()
+        print_to_err(f"::error title={type(e).__name__}::{type(e).__name__}: {str(e)}\n{exc}")
+        exit(1)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file: str) -> str:
+    file_hash = sha256()
+    with open(file, "rb") as f:
+        while len(chunk := f.read(HASH_CHUNK_SIZE)) > 0:
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def hash_files(files: list[str]) -> dict[str, str]:
+    """Hash the files concurrently, in chunks, so large files are never read at once."""
+    if len(files) <= 1:
+        return {f: hash_file(f) for f in files}
+    with ThreadPoolExecutor(max_workers=min(32, len(files))) as pool:
+        return dict(zip(files, pool.map(hash_file, files)))
@@ -0,0 +1,222 @@
+from __future__ import annotations
+import ast
+from dataclasses import dataclass, field
+from importlib.machinery import EXTENSION_SUFFIXES
+from importlib.util import find_spec
+from os import path
+from typing import Iterable, NamedTuple
+
+
+SOURCE_SUFFIXES = (".py", ".pyw")
+
+
+class ModuleFile(NamedTuple):
+    name: str
+    """dotted module name, __main__ for the script"""
+    file: str
+    is_package: bool
+
+
+class ImportRef(NamedTuple):
+    module: str
+    """imported module, empty for 'from . import x'"""
+    level: int
+    """number of leading dots of a relative import"""
+    names: tuple[str, ...]
+    """names of a from-import, they might be submodules"""
+    line: int
+    dynamic: bool = False
+    """importlib.import_module/__import__ call, the module is empty if its name is no string literal"""
+
+
+DYNAMIC_IMPORT_FUNCTIONS = ("import_module", "__import__")
+
+
+def _string_constant(node: ast.AST | None) -> str | None:
+    return node.value if isinstance(node, ast.Constant) and isinstance(node.value, str) else None
+
+
+def _dynamic_import(node: ast.Call) -> ImportRef | None:
+    if not (isinstance(node.func, ast.Name) and node.func.id in DYNAMIC_IMPORT_FUNCTIONS
+            or isinstance(node.func, ast.Attribute) and node.func.attr == "import_module"
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == "importlib"):
+        return None
+    if (name := _string_constant(node.args[0] if len(node.args) > 0 else None)) is None:
+        return ImportRef("", 0, (), node.lineno, True)
+
+    t_level = len(name) - len(name.lstrip("."))
+    if t_level > 0 and isinstance(node.func, ast.Name) and node.func.id == "__import__":
+        return ImportRef("", 0, (), node.lineno, True)
+    t_package = next((_string_constant(k.value) for k in node.keywords if k.arg == "package"), None)
+    if t_package is None and len(node.args) > 1:
+        t_package = _string_constant(node.args[1])
+    if t_level > 0 and t_package is not None:
+        # import_module(".x", "a.b") imports a.b.x
+        t_parts = t_package.split(".")
+        if t_level - 1 >= len(t_parts):
+            return ImportRef("", 0, (), node.lineno, True)
+        return ImportRef(".".join(t_parts[:len(t_parts) - (t_level - 1)] + [name[t_level:]]).rstrip("."), 0, (), node.lineno, True)
+    return ImportRef(name[t_level:], t_level, (), node.lineno, True)
+
+
+def find_imports(tree: ast.AST) -> list[ImportRef]:
+    imports: list[ImportRef] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(ImportRef(alias.name, 0, (), node.lineno) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append(ImportRef(node.module or "", node.level, tuple(a.name for a in node.names if a.name != "*"), node.lineno))
+        elif isinstance(node, ast.Call) and (ref := _dynamic_import(node)) is not None:
+            imports.append(ref)
+    return imports
+
+
+def _module_file(root: str, name: str) -> tuple[str, bool] | None:
+    t_base = path.join(root, *name.split("."))
+    if path.isfile(t_init := path.join(t_base, "__init__.py")):
+        return t_init, True
+    for suffix in SOURCE_SUFFIXES + tuple(EXTENSION_SUFFIXES):
+        if path.isfile(t_base + suffix):
+            return t_base + suffix, False
+    return None
+
+
+def resolve_module(name: str, roots: Iterable[str]) -> list[ModuleFile]:
+    """Return the local files importing name executes (parent package __init__ files first), empty if it is not local."""
+    for root in roots:
+        t_parts = name.split(".")
+        t_files: list[ModuleFile] = []
+        for i in range(1, len(t_parts) + 1):
+            t_name = ".".join(t_parts[:i])
+            if (t_found := _module_file(root, t_name)) is not None:
+                t_files.append(ModuleFile(t_name, *t_found))
+            elif not path.isdir(path.join(root, *t_parts[:i])):
+                # neither module nor (namespace) package in this root
+                t_files = []
+                break
+        if len(t_files) > 0 and t_files[-1].name == name:
+            return t_files
+    return []
+
+
+def absolute_import_name(importer: ModuleFile, ref: ImportRef) -> str | None:
+    if ref.level == 0:
+        return ref.module or None
+    t_package = importer.name if importer.is_package else importer.name.rpartition(".")[0]
+    if importer.name == "__main__":
+        t_package = ""
+    t_parts = t_package.split(".") if t_package != "" else []
+    if ref.level - 1 > len(t_parts):
+        return None
+    t_base = ".".join(t_parts[:len(t_parts) - (ref.level - 1)])
+    return ".".join(p for p in (t_base, ref.module) if p != "") or None
+
+
+def parse_module(module: ModuleFile) -> ast.AST | None:
+    """Parse a python source file, None for extension modules and sources this interpreter cannot parse."""
+    if not module.file.endswith(SOURCE_SUFFIXES):
+        return None
+    with open(module.file, "rb") as f:
+        source = f.read()
+    try:
+        return ast.parse(source, module.file)
+    except (SyntaxError, ValueError):
+        return None
+
+
+@dataclass
+class ImportAnalysis:
+    modules: list[ModuleFile] = field(default_factory=list)
+    """all local modules including the script"""
+    unparsable: list[ModuleFile] = field(default_factory=list)
+    """local sources that could not be parsed, their imports are unknown"""
+    static_imports: dict[str, list[tuple[str, int]]] = field(default_factory=dict)
+    """absolute name of every import statement -> (file, line) of its uses"""
+    dynamic_imports: dict[str, list[tuple[str, int]]] = field(default_factory=dict)
+    """absolute name of every import_module/__import__ call with a constant name -> (file, line) of its uses"""
+    unresolved_dynamic_imports: list[tuple[str, int]] = field(default_factory=list)
+    """(file, line) of import_module/__import__ calls whose name is not constant"""
+
+    @property
+    def imported_top_level_modules(self) -> set[str]:
+        return {name.partition(".")[0] for name in (*self.static_imports, *self.dynamic_imports)}
+
+
+def analyze_imports(scripts: Iterable[str], roots: Iterable[str]) -> ImportAnalysis:
+    """Follow the static and constant dynamic imports of the scripts through all modules found below roots."""
+    roots = list(dict.fromkeys(path.abspath(r) for r in roots))
+    t_scripts = [ModuleFile("__main__", path.abspath(script), False) for script in scripts]
+    modules: dict[str, ModuleFile] = {path.normcase(m.file): m for m in t_scripts}
+    analysis = ImportAnalysis()
+    queue = list(modules.values())
+    while len(queue) > 0:
+        module = queue.pop()
+        if (tree := parse_module(module)) is None:
+            if module.file.endswith(SOURCE_SUFFIXES):
+                analysis.unparsable.append(module)
+            continue
+        for ref in find_imports(tree):
+            if (name := absolute_import_name(module, ref)) is None:
+                if ref.dynamic:
+                    analysis.unresolved_dynamic_imports.append((module.file, ref.line))
+                continue
+            t_imports = analysis.dynamic_imports if ref.dynamic else analysis.static_imports
+            t_imports.setdefault(name, []).append((module.file, ref.line))
+            t_found = resolve_module(name, roots)
+            for imported_name in ref.names:
+                if len(t_submodule := resolve_module(f"{name}.{imported_name}", roots)) > 0:
+                    t_found.append(t_submodule[-1])
+                    analysis.static_imports.setdefault(f"{name}.{imported_name}", []).append((module.file, ref.line))
+            for found in t_found:
+                if (t_key := path.normcase(found.file)) not in modules:
+                    modules[t_key] = found
+                    queue.append(found)
+    analysis.modules = sorted(modules.values(), key=lambda m: path.normcase(m.file))
+    return analysis
+
+
+# MARK: suggestions
+EXCLUDE_CANDIDATES: dict[str, str | None] = {
+    # stdlib modules that are only pulled in by optional imports of other modules, value None
+    "tkinter": None,
+    "pydoc_data": None,
+    # heavy third-party packages (value: distribution name) that get bundled because a dependency imports them optionally
+    "IPython": "ipython",
+    "jedi": "jedi",
+    "matplotlib": "matplotlib",
+    "notebook": "notebook",
+    "PyQt5": "pyqt5",
+    "PyQt6": "pyqt6",
+    "PySide2": "pyside2",
+    "PySide6": "pyside6",
+}
+
+
+def suggest_hidden_imports(analysis: ImportAnalysis, hidden_imports: Iterable[str], exclude_modules: Iterable[str]) -> list[str]:
+    """Modules only imported dynamically, pyinstaller cannot see them."""
+    t_known = set(hidden_imports) | set(analysis.static_imports)
+    t_excluded = set(exclude_modules)
+    return sorted(name for name in analysis.dynamic_imports
+                  if name not in t_known and name.partition(".")[0] not in t_excluded)
+
+
+def suggest_exclude_modules(analysis: ImportAnalysis, hidden_imports: Iterable[str], exclude_modules: Iterable[str], required_distributions: Iterable[str]) -> list[str]:
+    """Heavy modules the local code never imports and that are no direct requirement. Third-party packages may still
+    import them, so they are only worth a look, never safe to exclude blindly. Whether they are installed at all is
+    only known in the build environment, see installed_modules."""
+    t_used = analysis.imported_top_level_modules | {name.partition(".")[0] for name in hidden_imports} | set(exclude_modules)
+    t_required = set(required_distributions)
+    return sorted(module for module, distribution in EXCLUDE_CANDIDATES.items()
+                  if module not in t_used and (distribution is None or distribution not in t_required))
+
+
+def installed_modules(modules: Iterable[str]) -> list[str]:
+    """The top-level modules the running python can import, found without importing them."""
+    t_installed: list[str] = []
+    for module in modules:
+        try:
+            if find_spec(module) is not None:
+                t_installed.append(module)
+        except (ImportError, ValueError):
+            continue
+    return t_installed
@@ -1,190 +1,374 @@
-from os import path
+from __future__ import annotations
+from hashlib import sha256
+from json import dump, dumps
+from os import environ, name as os_name, path
+from shlex import split
+from shutil import which
+from subprocess import DEVNULL, CalledProcessError, check_output
 from sys import exc_info, stderr
 from traceback import format_exc
-from lib.github_storage_manager import GithubENVManager, GithubOutputManager
+from typing import Any
+from lib.github_storage_manager import GithubENVManager, GithubOutputManager, batch_writes
 
-from lib.logger_gh_actions import use_std_config
-from lib.logger import Logger
+from lib.logger_gh_actions import flush_github_streams, use_std_config
+from lib.logger import LOG_LEVEL, CrashLogFile, Logger, RingBufferHandler, get_spans
+from input_schema import INPUT_KIND, PATH_CHECK, InputError, InputSpec, env_annotations, output_annotations, parse_inputs, write_outputs
+from data_staging import DataFile, data_files, plan_staging, write_staging_plan
+from file_hash import hash_files
+from import_graph import ImportAnalysis, ModuleFile, analyze_imports, suggest_exclude_modules, suggest_hidden_imports
+from requirements_diff import parse_requirements_include, requirement_names, unpinned_requirements
+from spec_file import MAKESPEC_OPTIONS, Target, makespec_options, render_spec
+from timing import append_spans
 
 
 def print_to_err(x: str) -> None:
     return print(x, file=stderr)
 
 
-class InputError(ValueError):
-    pass
+IMPORT_ANALYSIS_MODES = ("off", "report", "apply")
+OPTIMIZE_LEVELS = ("0", "1", "2")
+COMPRESSION_LEVELS = tuple(str(level) for level in range(10))
+
+INPUT_SCHEMA: tuple[InputSpec, ...] = (
+    InputSpec("python-requirements-file-path", "INPUT_PYTHON_REQUIREMENTS_FILE_PATH", "python_requirements_file_path", INPUT_KIND.PATH, path_check=PATH_CHECK.EXISTS),
+    InputSpec("input-file-path", "INPUT_INPUT_FILE_PATH", None, INPUT_KIND.TARGET_LIST, required=True, path_check=PATH_CHECK.FILE),
+    InputSpec("onefile", "INPUT_ONEFILE", None, INPUT_KIND.BOOL),
+    InputSpec("no-console", "INPUT_NO_CONSOLE", None, INPUT_KIND.BOOL),
+    InputSpec("output-name", "INPUT_OUTPUT_NAME", None),
+    InputSpec("output-path", "INPUT_OUTPUT_PATH", "dist_path", INPUT_KIND.PATH, required=True),
+    InputSpec("icon-path", "INPUT_ICON_PATH", None, INPUT_KIND.PATH, path_check=PATH_CHECK.FILE),
+    InputSpec("additional-data", "INPUT_ADDITIONAL_DATA", None, INPUT_KIND.DATA_LIST, path_check=PATH_CHECK.EXISTS),
+    InputSpec("paths", "INPUT_PATHS", None, INPUT_KIND.PATH_LIST, path_check=PATH_CHECK.EXISTS),
+    InputSpec("hidden-imports", "INPUT_HIDDEN_IMPORTS", None, INPUT_KIND.LIST),
+    InputSpec("exclude-modules", "INPUT_EXCLUDE_MODULES", None, INPUT_KIND.LIST),
+    InputSpec("optimize", "INPUT_OPTIMIZE", None, choices=OPTIMIZE_LEVELS, default=lambda values: "0"),
+    InputSpec("strip", "INPUT_STRIP", None, INPUT_KIND.BOOL),
+    InputSpec("upx", "INPUT_UPX", None, INPUT_KIND.BOOL),
+    InputSpec("upx-exclude", "INPUT_UPX_EXCLUDE", None, INPUT_KIND.LIST),
+    InputSpec("onefile-compression-level", "INPUT_ONEFILE_COMPRESSION_LEVEL", None, choices=COMPRESSION_LEVELS),
+    InputSpec("incremental", "INPUT_INCREMENTAL", None, INPUT_KIND.BOOL),
+    InputSpec("reproducible", "INPUT_REPRODUCIBLE", None, INPUT_KIND.BOOL),
+    InputSpec("import-analysis", "INPUT_IMPORT_ANALYSIS", None, choices=IMPORT_ANALYSIS_MODES, default=lambda values: "off"),
+)
+
+BUILD_MANIFEST_VERSION = 3
+DEFAULT_SOURCE_DATE_EPOCH = 315532800
+"""1980-01-01, the earliest time zip archives can store"""
 
 
 class ENVStorage(GithubENVManager):
-    INPUT_PYTHON_REQUIREMENTS_FILE_PATH: str
-    INPUT_INPUT_FILE_PATH: str
-    INPUT_ONEFILE: str
-    INPUT_NO_CONSOLE: str
-    INPUT_OUTPUT_NAME: str
-    INPUT_OUTPUT_PATH: str
-    INPUT_ICON_PATH: str
-    INPUT_ADDITIONAL_DATA: str
-    INPUT_PATHS: str
-    INPUT_HIDDEN_IMPORTS: str
-    INPUT_EXCLUDE_MODULES: str
+    __annotations__ = {**env_annotations(INPUT_SCHEMA),
+                       "INPUT_PYTHON_VERSION": str,
+                       "INPUT_ADDITIONAL_ARGUMENTS": str,
+                       "TIMING_FILE_PATH": str,
+                       "BUILD_MANIFEST_FILE_PATH": str,
+                       "SPEC_FILE_PATH": str,
+                       "DATA_STAGING_PATH": str,
+                       "DATA_STAGING_PLAN_FILE_PATH": str}
 
 
 class OutputStorage(GithubOutputManager):
-    python_requirements_file_path: str
-    file_path: str
-    onefile: str
-    no_console: str
-    output_name: str
-    output_path: str
-    icon: str
-    additional_data: str
-    paths: str
-    hidden_imports: str
-    exclude_modules: str
+    __annotations__ = {**output_annotations(INPUT_SCHEMA),
+                       "python_requirements_hash": str,
+                       "cache_key": str,
+                       "timing_file_path": str,
+                       "spec_file_path": str,
+                       "target_count": int,
+                       "build_manifest_file_path": str,
+                       "build_manifest_hash": str,
+                       "suggested_hidden_imports": str,
+                       "exclude_candidates": str,
+                       "source_date_epoch": str,
+                       "pythonhashseed": str,
+                       "data_staging_plan_file_path": str}
 
 
 logger: Logger
 
 
-def validate_inputs():
-    if (python_requirements_file := ENVStorage.INPUT_PYTHON_REQUIREMENTS_FILE_PATH) != "":
-        if not path.exists(python_requirements_file):
-            raise InputError(f"python-requirements-file-path {python_requirements_file} does not exist!")
-        OutputStorage.python_requirements_file_path = python_requirements_file = path.abspath(python_requirements_file)
-
-        logger.debug(f"Use python requirement file: {python_requirements_file}")
-    else:
-        OutputStorage.python_requirements_file_path = ""
-
-        logger.debug("No python requrement file")
-
-
-    if (input_file := ENVStorage.INPUT_INPUT_FILE_PATH) == "":
-        raise InputError("input-file-path is required!")
-    input_file = path.abspath(input_file.replace('"', ""))
-    if not path.exists(input_file) or not path.isfile(input_file):
-        raise InputError(f"input-file-path {input_file} does not exist!")
-    OutputStorage.file_path = input_file
-
-    logger.debug(f"Use python input file: {input_file}")
-
-    if (onefile := ENVStorage.INPUT_ONEFILE) not in ["true", "false"]:
-        raise InputError(f"onefile must be either true or false, got {onefile}!")
-    OutputStorage.onefile = "--onefile" if onefile == "true" else ""
-
-    logger.debug(f"onefile mode: {onefile == 'true'}")
+def hash_requirements_file(python_requirements_file: str) -> str:
+    """Hash a requirements file together with all files it includes via -r/-c."""
+    requirements_hash = sha256()
+    visited: set[str] = set()
+
+    def visit(file: str) -> None:
+        file = path.normcase(path.abspath(file))
+        if file in visited:
+            return
+        visited.add(file)
+        if not path.isfile(file):
+            raise InputError(f"python requirements file {file} does not exist!")
+        with open(file, "rb") as f:
+            content = f.read()
+        requirements_hash.update(sha256(content).digest())
+        for line in content.decode("utf-8", "replace").splitlines():
+            line = line.split(" #", 1)[0].strip()
+            if (include := parse_requirements_include(line)) is not None:
+                requirements_hash.update(f"include={include}\n".encode())
+                visit(path.join(path.dirname(file), include))
+
+    if python_requirements_file != "":
+        visit(python_requirements_file)
+    return requirements_hash.hexdigest()
+
+
+def resolve_targets(values: dict[str, Any]) -> list[Target]:
+    """Apply the output-name and icon-path inputs to the targets without overrides and check the output names are unique."""
+    if len(t_entries := values["input-file-path"]) > 1 and values["output-name"] != "":
+        raise InputError("output-name can only be used with a single input file, set the names per input file as path;output-name!")
+    targets: list[Target] = []
+    t_names: dict[str, str] = {}
+    for script, name, icon in t_entries:
+        if name == "":
+            name = values["output-name"] if values["output-name"] != "" else path.splitext(path.basename(script))[0]
+        if (t_other := t_names.setdefault(path.normcase(name), script)) != script:
+            raise InputError(f"input files {t_other} and {script} both use the output name {name}!")
+        targets.append(Target(script, name, icon if icon != "" else values["icon-path"]))
+    return targets
+
+
+def source_date_epoch() -> int:
+    """SOURCE_DATE_EPOCH if already set, else the commit time of HEAD, else DEFAULT_SOURCE_DATE_EPOCH."""
+    if (t_epoch := environ.get("SOURCE_DATE_EPOCH", "")) != "":
+        if not t_epoch.isdigit():
+            raise InputError(f"SOURCE_DATE_EPOCH must be a unix timestamp, got {t_epoch}!")
+        return int(t_epoch)
+    try:
+        return int(check_output(["git", "log", "-1", "--format=%ct"], stderr=DEVNULL, text=True).strip())
+    except (OSError, CalledProcessError, ValueError):
+        logger.debug("No git commit time, use the default SOURCE_DATE_EPOCH")
+        return DEFAULT_SOURCE_DATE_EPOCH
+
+
+def check_build_profile(values: dict[str, Any], additional_arguments: str) -> None:
+    """Reject build profile options that have no effect in the chosen combination."""
+    t_upx_dir = any(a == "--upx-dir" or a.startswith("--upx-dir=") for a in split(additional_arguments, posix=False))
+    if len(values["upx-exclude"]) > 0 and not values["upx"]:
+        raise InputError("upx-exclude needs upx to be true!")
+    if t_upx_dir and not values["upx"]:
+        raise InputError("additional-arguments --upx-dir needs upx to be true, the generated spec file disables upx otherwise!")
+    if values["onefile-compression-level"] != "" and not values["onefile"]:
+        raise InputError("onefile-compression-level only applies to onefile builds!")
+    if values["strip"] and os_name == "nt":
+        logger.warning("strip is enabled on windows, stripping windows binaries can break them and needs a strip executable on PATH")
+    elif values["strip"] and which("strip") is None:
+        logger.warning("strip is enabled but no strip executable was found on PATH, pyinstaller cannot strip the binaries")
+    if values["upx"] and which("upx") is None and not t_upx_dir:
+        logger.warning("upx is enabled but no upx executable was found on PATH, pyinstaller will skip the compression")
+
+
+def check_additional_arguments(additional_arguments: str) -> None:
+    """Reject pyinstaller options that cannot be combined with the generated spec file, pyinstaller would only fail at build time."""
+    try:
+        t_arguments = split(additional_arguments, posix=False)
+    except ValueError as e:
+        raise InputError(f"additional-arguments {additional_arguments} cannot be split: {e}!")
+    for argument, option in makespec_options(t_arguments):
+        if (t_input := MAKESPEC_OPTIONS[option]) is not None:
+            raise InputError(f"additional-arguments {argument} cannot be used with the generated spec file, use the {t_input} input instead!")
+        raise InputError(f"additional-arguments {argument} cannot be used with the generated spec file, the action has no input for it!")
+
+
+def write_spec_file(spec_file: str, spec: str) -> str:
+    with open(spec_file := path.abspath(spec_file), "w", encoding="utf-8", newline="\n") as f:
+        f.write(spec)
+    return spec_file
+
+
+def compute_cache_key(python_version: str, python_requirements_hash: str, spec: str, data: list[DataFile]) -> str:
+    """Hash the inputs that invalidate the pyinstaller workpath when they change, the spec covers all build options
+    and data the additional-data files, which the spec only references by their staging path."""
+    key = sha256()
+    key.update(f"python-version={python_version}\n".encode())
+    key.update(f"requirements={python_requirements_hash}\n".encode())
+    key.update(spec.encode())
+    for file in sorted(data, key=lambda f: f.target):
+        key.update(f"data={file.target};{path.normpath(file.source)}\n".encode())
+    return key.hexdigest()
+
+
+def _manifest_path(p: str) -> str:
+    try:
+        return path.relpath(p).replace("\\", "/")
+    except ValueError:
+        # on another drive than the working directory
+        return p.replace("\\", "/")
 
-    if (no_console := ENVStorage.INPUT_NO_CONSOLE) not in ["true", "false"]:
-        raise InputError(f"no-console must be either true or false, got {no_console}!")
-    OutputStorage.no_console = "--noconsole" if no_console == "true" else ""
 
-    logger.debug(f"noconsole mode: {no_console == 'true'}")
+def build_manifest_files(targets: list[Target], modules: list[ModuleFile], data: list[DataFile]) -> list[str]:
+    return list(dict.fromkeys([m.file for m in modules] + [f.source for f in data] + [t.icon for t in targets if t.icon != ""]))
 
-    if (output_name := ENVStorage.INPUT_OUTPUT_NAME) == "":
-        output_name = path.splitext(path.basename(input_file))[0]
-    OutputStorage.output_name = output_name
-    logger.debug(f"Use output name: {output_name}")
 
-    if (output_path := ENVStorage.INPUT_OUTPUT_PATH) == "":
+def compute_build_manifest(values: dict[str, Any], spec: str, targets: list[Target], modules: list[ModuleFile], data: list[DataFile], hashes: dict[str, str], python_version: str, python_requirements_hash: str, additional_arguments: str) -> dict[str, Any]:
+    """Describe everything that ends up in the executables: the local import closure of the input files, the additional data,
+    the icons and the build options. Equal manifests build equal executables. hashes covers build_manifest_files."""
+    t_icons = [t.icon for t in targets if t.icon != ""]
+    return {
+        "version": BUILD_MANIFEST_VERSION,
+        "spec": sha256(spec.encode()).hexdigest(),
+        "reproducible": values["reproducible"],
+        "python_version": python_version,
+        "python_requirements_hash": python_requirements_hash,
+        "additional_arguments": additional_arguments,
+        "sources": {_manifest_path(m.file): hashes[m.file] for m in modules},
+        "data": {f"{_manifest_path(f.source)};{f.target}": hashes[f.source] for f in data},
+        "icons": {_manifest_path(icon): hashes[icon] for icon in t_icons},
+    }
 
-        raise InputError("output-path is required!")
-    output_path = path.abspath(output_path.replace('"', ""))
-    OutputStorage.output_path = '--distpath "' + output_path + '"'
 
-    logger.debug(f"Use output path: {output_path}")
+def write_build_manifest(values: dict[str, Any], spec: str, targets: list[Target], modules: list[ModuleFile], data: list[DataFile], python_requirements_hash: str) -> dict[str, str]:
+    """Write the build manifest and set its outputs, returns the hashes of all files it covers."""
+    # the build cache key only covers the requirements file, not the versions pip resolves from it
+    if len(t_unpinned := unpinned_requirements(values["python-requirements-file-path"], ("pyinstaller",))) > 0:
+        logger.warning("Incremental builds only detect changed requirements with pinned versions, pin %s with ==", ", ".join(t_unpinned))
 
-    if (icon_path := ENVStorage.INPUT_ICON_PATH) != "":
-        icon_path = path.abspath(icon_path.replace('"', ""))
-        if not path.exists(icon_path) or not path.isfile(icon_path):
-            raise InputError(f"icon-path {icon_path} does not exist!")
-        OutputStorage.icon = '--icon "' + icon_path + '"'
+    with logger.span("build manifest"):
+        hashes = hash_files(build_manifest_files(targets, modules, data))
+        manifest = compute_build_manifest(values, spec, targets, modules, data, hashes, ENVStorage.INPUT_PYTHON_VERSION, python_requirements_hash, ENVStorage.INPUT_ADDITIONAL_ARGUMENTS)
+        t_manifest = dumps(manifest, sort_keys=True, separators=(",", ":"))
+        with open(manifest_file := path.abspath(ENVStorage.BUILD_MANIFEST_FILE_PATH), "w", encoding="utf-8") as f:
+            dump(manifest, f, sort_keys=True, indent=2)
 
-        logger.debug(f"Use icon: {icon_path}")
-    else:
-        OutputStorage.icon = ""
+    OutputStorage.build_manifest_file_path = manifest_file
+    OutputStorage.build_manifest_hash = build_manifest_hash = sha256(t_manifest.encode()).hexdigest()
 
-        logger.debug("No icon")
+    logger.debug("Build manifest covers %s source, %s data and %s icon files", len(manifest["sources"]), len(manifest["data"]), len(manifest["icons"]))
+    logger.debug("Use build manifest hash: %s", build_manifest_hash)
+    return hashes
 
-    if (additional_data := ENVStorage.INPUT_ADDITIONAL_DATA) != "":
-        additional_datas_in = additional_data.replace('"', "").split("\n")
 
+def _uses(uses: list[tuple[str, int]]) -> str:
+    return ", ".join(f"{_manifest_path(file)}:{line}" for file, line in uses)
 
-        additional_datas_out: list[tuple[str, str]] = []
-        while "" in additional_datas_in:
-            additional_datas_in.remove("")
-        for p in additional_datas_in:
-            ad_path, ad_target = p.split(";")
 
+def suggest_imports(values: dict[str, Any], analysis: ImportAnalysis) -> None:
+    """Report the hidden imports and exclude modules the import analysis suggests and add the hidden imports to values in apply mode.
+    Exclude module candidates are only passed on to the build step, the dependencies of the requirements may import them."""
+    hidden_imports = suggest_hidden_imports(analysis, values["hidden-imports"], values["exclude-modules"])
+    t_required = requirement_names(values["python-requirements-file-path"]) if values["python-requirements-file-path"] != "" else set()
+    exclude_modules = suggest_exclude_modules(analysis, values["hidden-imports"], values["exclude-modules"], t_required)
 
-            ad_path = path.abspath(ad_path)
-            if not path.exists(ad_path):
-                raise InputError(f"additional-data path {ad_path} does not exist!")
+    for file, line in analysis.unresolved_dynamic_imports:
+        logger.warning("Dynamic import with a non-constant name at %s, add the module to hidden-imports if the executable misses it", _uses([(file, line)]))
+    for hidden_import in hidden_imports:
+        logger.info("Suggested hidden import %s, only imported dynamically at %s", hidden_import, _uses(analysis.dynamic_imports[hidden_import]))
 
+    OutputStorage.suggested_hidden_imports = "\n".join(hidden_imports)
+    # the build step suggests the candidates installed in the build environment, this python is not the one building
+    OutputStorage.exclude_candidates = "\n".join(exclude_modules)
+    if values["import-analysis"] == "apply":
+        values["hidden-imports"] = values["hidden-imports"] + hidden_imports
 
-            additional_datas_out.append((ad_path, ad_target))
-        OutputStorage.additional_data = "--add-data " + " --add-data ".join([f'"{ad_path};{ad_target}"' for ad_path, ad_target in additional_datas_out])
 
-        logger.debug(f"Use additional data: {additional_datas_out}")
+def validate_inputs():
+    ENVStorage.load()
+
+    with logger.span("parse inputs"):
+        values = parse_inputs(INPUT_SCHEMA, ENVStorage)
+        targets = resolve_targets(values)
+        check_additional_arguments(ENVStorage.INPUT_ADDITIONAL_ARGUMENTS)
+        check_build_profile(values, ENVStorage.INPUT_ADDITIONAL_ARGUMENTS)
+    t_scripts = [t.script for t in targets]
+
+    analysis: ImportAnalysis | None = None
+    if values["incremental"] or values["import-analysis"] != "off":
+        with logger.span("analyze imports"):
+            analysis = analyze_imports(t_scripts, [*(path.dirname(s) for s in t_scripts), *values["paths"]])
+        for module in analysis.unparsable:
+            logger.warning("Could not parse %s, its imports are not analyzed", module.file)
+
+    if analysis is not None and values["import-analysis"] != "off":
+        with logger.span("suggest imports"):
+            suggest_imports(values, analysis)
     else:
-        OutputStorage.additional_data = ""
-
-        logger.debug("No additional data")
-
-    if (paths := ENVStorage.INPUT_PATHS) != "":
-        paths_in = paths.replace('"', "").split("\n")
-        paths_out: list[str] = []
-        while "" in paths_in:
-            paths_in.remove("")
-        for p in paths_in:
-
+        OutputStorage.suggested_hidden_imports = OutputStorage.exclude_candidates = ""
+
+    with logger.span("write outputs"):
+        write_outputs(INPUT_SCHEMA, values, OutputStorage)
+
+    for spec in INPUT_SCHEMA:
+        if values[spec.name] in ("", []):
+            logger.debug("No %s", spec.name)
+        else:
+            logger.debug("Use %s: %s", spec.name, values[spec.name])
+    for target in targets:
+        logger.debug("Use target %s: %s", target.name, target.script)
+
+    data = data_files(values["additional-data"])
+    staging_path = path.abspath(ENVStorage.DATA_STAGING_PATH) if ENVStorage.DATA_STAGING_PATH != "" and len(data) > 0 else ""
+    if staging_path != "":
+        # pyinstaller only gets the staged tree, the build step stages it with the bundle layout
+        values["additional-data"] = [(staging_path, ".")]
+
+    with logger.span("write spec"):
+        spec = render_spec(targets, values)
+        OutputStorage.spec_file_path = spec_file = write_spec_file(ENVStorage.SPEC_FILE_PATH, spec)
+        OutputStorage.target_count = len(targets)
+
+    logger.debug("Use spec file: %s", spec_file)
+
+    if values["reproducible"]:
+        # only the build and dist manifest steps get them, later steps of the caller keep their own environment
+        OutputStorage.source_date_epoch = epoch = str(source_date_epoch())
+        OutputStorage.pythonhashseed = "0"
+        logger.debug("Use SOURCE_DATE_EPOCH %s and PYTHONHASHSEED 0 for the build", epoch)
+    else:
+        OutputStorage.source_date_epoch = OutputStorage.pythonhashseed = ""
 
-            p = path.abspath(p)
-            if not path.exists(p):
-                raise InputError(f"path {p} does not exist!")
-            paths_out.append(f'"{p}"')
-        OutputStorage.paths = "--paths" + ";".join(paths_out)
+    with logger.span("hash requirements"):
+        OutputStorage.python_requirements_hash = python_requirements_hash = hash_requirements_file(values["python-requirements-file-path"])
 
-        logger.debug(f"Use additional paths: {paths_out}")
-    else:
-        OutputStorage.paths = ""
+    logger.debug("Use python requirements hash: %s", python_requirements_hash)
 
-        logger.debug("No additional paths")
+    with logger.span("compute cache key"):
+        OutputStorage.cache_key = cache_key = compute_cache_key(ENVStorage.INPUT_PYTHON_VERSION, python_requirements_hash, spec, data)
 
-    if (hidden_imports := ENVStorage.INPUT_HIDDEN_IMPORTS) != "":
-        hidden_imports = hidden_imports.split("\n")
-        while "" in hidden_imports:
-            hidden_imports.remove("")
-        OutputStorage.hidden_imports = "--hidden-import " + " --hidden-import ".join(hidden_imports)
+    logger.debug("Use build cache key: %s", cache_key)
 
-        logger.debug(f"Use hidden imports {hidden_imports}")
+    hashes: dict[str, str] | None = None
+    if analysis is not None and values["incremental"]:
+        hashes = write_build_manifest(values, spec, targets, analysis.modules, data, python_requirements_hash)
     else:
-        OutputStorage.hidden_imports = ""
+        OutputStorage.build_manifest_file_path = OutputStorage.build_manifest_hash = ""
 
-        logger.debug("No hidden imports")
+    if staging_path == "":
+        OutputStorage.data_staging_plan_file_path = ""
+        return
+    with logger.span("plan data staging"):
+        # staging itself is part of the build step, which is skipped when the previous build is restored
+        plan = plan_staging(data, hashes)
+        OutputStorage.data_staging_plan_file_path = plan_file = write_staging_plan(ENVStorage.DATA_STAGING_PLAN_FILE_PATH, staging_path, plan)
+    logger.debug("Use data staging plan %s: %s data files as %s staged files in %s", plan_file, len(data), len(plan), staging_path)
 
-    if (exclude_modules := ENVStorage.INPUT_EXCLUDE_MODULES) != "":
-        exclude_modules = exclude_modules.split("\n")
-        while "" in exclude_modules:
-            exclude_modules.remove("")
-        OutputStorage.exclude_modules = "--exclude-module " + " --exclude-module ".join(exclude_modules)
-
-        logger.debug(f"Use exclude modules: {exclude_modules}")
-    else:
-        OutputStorage.exclude_modules = ""
 
-        logger.debug("No excluded modules")
+def write_timing_file():
+    """Start a new timing file with the spans of this run, later steps append their spans to it."""
+    if ENVStorage.TIMING_FILE_PATH == "":
+        OutputStorage.timing_file_path = ""
+        return
+    OutputStorage.timing_file_path = timing_file = append_spans(ENVStorage.TIMING_FILE_PATH, get_spans(), "input parser", clear=True)
+    logger.debug("Use timing file: %s", timing_file)
 
 
 if __name__ == "__main__":
+    crash_handler: RingBufferHandler | None = None
     try:
         use_std_config()
+        crash_handler = RingBufferHandler(CrashLogFile(path.join(environ.get("RUNNER_TEMP", ""), "pyinstaller_action_crash_"), ".log"), LOG_LEVEL.DEBUG)
         logger = Logger("")
-        validate_inputs()
+        with batch_writes():
+            with logger.span("input parser"):
+                validate_inputs()
+            write_timing_file()
     except BaseException as e:
         exc = format_exc()
         exc_type, exc_obj, exc_tb = exc_info()
         ln = exc_tb.tb_lineno if exc_tb is not None else -1
         fname = path.split(exc_tb.tb_frame.f_code.co_filename)[1] if exc_tb is not None else ""
+        crash_log = crash_handler.dump() if crash_handler is not None else None
         # gets primted differently therefore not per logger
-        print_to_err(f"::error title={type(e).__name__}::{type(e).__name__}: {str(e)}\n{exc}")
+        flush_github_streams()
+        # on the first line, the annotation only shows that
+        t_crash_log = f" (debug log: {crash_log})" if crash_log is not None else ""
+        print_to_err(f"::error title={type(e).__name__}::{type(e).__name__}: {str(e)}{t_crash_log}\n{exc}")
         exit(1)
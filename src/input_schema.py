@@ -0,0 +1,232 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from glob import glob
+from os import path, stat, stat_result
+from stat import S_ISREG
+from typing import Any, Callable, Iterable, Optional
+
+
+class InputError(ValueError):
+    pass
+
+
+class INPUT_KIND(Enum):
+    STRING = 0
+    BOOL = 1
+    PATH = 2
+    LIST = 3
+    """newline separated entries"""
+    PATH_LIST = 4
+    """newline separated paths"""
+    DATA_LIST = 5
+    """newline separated source;target pairs, the source being a path"""
+    TARGET_LIST = 6
+    """newline separated path[;output-name[;icon-path]] entries"""
+
+
+class PATH_CHECK(Enum):
+    NONE = 0
+    EXISTS = 1
+    FILE = 2
+
+
+@dataclass(frozen=True)
+class InputSpec:
+    name: str
+    """name of the action input, used in messages"""
+    env: str
+    """ENVStorage attribute the raw value is read from"""
+    output: Optional[str]
+    """OutputStorage attribute the formatted value is written to"""
+    kind: INPUT_KIND = INPUT_KIND.STRING
+    required: bool = False
+    path_check: PATH_CHECK = PATH_CHECK.NONE
+    default: Optional[Callable[[dict[str, Any]], Any]] = None
+    """computes the value of an empty input from the already parsed values"""
+    choices: tuple[str, ...] = ()
+    """allowed values of a string input, empty for any"""
+
+
+class StatCache:
+    """Stats paths concurrently and remembers the results, so no path is statted twice."""
+
+    def __init__(self, max_workers: int = 32):
+        self.max_workers = max_workers
+        self.__results: dict[str, stat_result | None] = {}
+
+    @staticmethod
+    def _stat(p: str) -> stat_result | None:
+        try:
+            return stat(p)
+        except OSError:
+            return None
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        t_missing = [p for p in dict.fromkeys(path.normcase(p) for p in paths) if p not in self.__results]
+        if len(t_missing) <= 1:
+            for p in t_missing:
+                self.__results[p] = self._stat(p)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(t_missing))) as pool:
+            for p, st in zip(t_missing, pool.map(self._stat, t_missing)):
+                self.__results[p] = st
+
+    def stat(self, p: str) -> stat_result | None:
+        p = path.normcase(p)
+        if p not in self.__results:
+            self.__results[p] = self._stat(p)
+        return self.__results[p]
+
+    def exists(self, p: str) -> bool:
+        return self.stat(p) is not None
+
+    def isfile(self, p: str) -> bool:
+        return (st := self.stat(p)) is not None and S_ISREG(st.st_mode)
+
+
+def _split_entries(raw: str) -> list[str]:
+    # dict.fromkeys deduplicates while keeping the order
+    return list(dict.fromkeys(e for e in (e.strip() for e in raw.split("\n")) if e != ""))
+
+
+def _has_glob_magic(p: str) -> bool:
+    return any(c in p for c in "*?[")
+
+
+def _glob_base(pattern: str) -> str:
+    """The leading directories of pattern without glob characters."""
+    t_parts = pattern.replace("\\", "/").split("/")
+    t_index = next(i for i, part in enumerate(t_parts) if _has_glob_magic(part))
+    return "/".join(t_parts[:t_index]) or "."
+
+
+def _glob_data(pattern: str, target: str) -> list[tuple[str, str]]:
+    """Expand an additional-data pattern. Every match keeps its path below the pattern's base directory inside target,
+    directories are skipped when the pattern also matches their content, like the directories of assets/**."""
+    # glob only returns existing paths, so the matches need no further check
+    t_matches = [path.abspath(m) for m in sorted(glob(pattern, recursive=True))]
+    t_base = path.abspath(_glob_base(pattern))
+    t_parents = {path.dirname(m) for m in t_matches}
+    data: list[tuple[str, str]] = []
+    for match in t_matches:
+        if path.isdir(match):
+            if match in t_parents:
+                continue
+            # pyinstaller bundles the content of a directory into its target
+            t_rel = path.relpath(match, t_base)
+        else:
+            t_rel = path.relpath(path.dirname(match), t_base)
+        data.append((match, path.normpath(path.join(target, t_rel)).replace("\\", "/")))
+    return data
+
+
+def _normalize_path(spec: InputSpec, raw: str, path_checks: list[tuple[InputSpec, str]]) -> str:
+    p = path.abspath(raw.replace('"', "").strip())
+    if spec.path_check != PATH_CHECK.NONE:
+        path_checks.append((spec, p))
+    return p
+
+
+def parse_input(spec: InputSpec, raw: str, values: dict[str, Any], path_checks: list[tuple[InputSpec, str]]) -> Any:
+    """Parse and normalize one input. Paths that need checking are appended to path_checks instead of being checked here."""
+    if spec.kind == INPUT_KIND.BOOL:
+        if raw not in ("true", "false"):
+            raise InputError(f"{spec.name} must be either true or false, got {raw}!")
+        return raw == "true"
+
+    if raw.strip() == "":
+        if spec.required:
+            raise InputError(f"{spec.name} is required!")
+        if spec.default is not None:
+            return spec.default(values)
+        return [] if spec.kind in (INPUT_KIND.LIST, INPUT_KIND.PATH_LIST, INPUT_KIND.DATA_LIST, INPUT_KIND.TARGET_LIST) else ""
+
+    if spec.kind == INPUT_KIND.STRING:
+        if len(spec.choices) > 0 and raw not in spec.choices:
+            raise InputError(f"{spec.name} must be one of {', '.join(spec.choices)}, got {raw}!")
+        return raw
+    if spec.kind == INPUT_KIND.PATH:
+        return _normalize_path(spec, raw, path_checks)
+
+    entries = _split_entries(raw)
+    if spec.kind == INPUT_KIND.LIST:
+        return entries
+    if spec.kind == INPUT_KIND.PATH_LIST:
+        return list(dict.fromkeys(_normalize_path(spec, e, path_checks) for e in entries))
+
+    if spec.kind == INPUT_KIND.TARGET_LIST:
+        targets: dict[tuple[str, str, str], None] = {}
+        for entry in entries:
+            t_parts = [p.strip() for p in entry.replace('"', "").split(";")]
+            if len(t_parts) > 3 or t_parts[0] == "":
+                raise InputError(f"{spec.name} entry {entry} must have the form path[;output-name[;icon-path]]!")
+            t_parts += [""] * (3 - len(t_parts))
+            t_icon = _normalize_path(spec, t_parts[2], path_checks) if t_parts[2] != "" else ""
+            targets[(_normalize_path(spec, t_parts[0], path_checks), t_parts[1], t_icon)] = None
+        return list(targets)
+
+    data: dict[tuple[str, str], None] = {}
+    for entry in entries:
+        source, separator, target = entry.replace('"', "").rpartition(";")
+        if separator == "":
+            raise InputError(f"{spec.name} entry {entry} must have the form source;target!")
+        target = target.strip()
+        # an existing path is taken literally even if it contains glob characters, like 'lib [v2]'
+        if _has_glob_magic(source) and not path.exists(source.strip()):
+            if len(t_matches := _glob_data(source.strip(), target)) == 0:
+                raise InputError(f"{spec.name} pattern {source} does not match anything!")
+            data.update(dict.fromkeys(t_matches))
+        else:
+            data[(_normalize_path(spec, source, path_checks), target)] = None
+    return list(data)
+
+
+def check_paths(path_checks: list[tuple[InputSpec, str]], stat_cache: StatCache) -> None:
+    """Check all collected paths with one concurrent stat pass and report the first failing one in input order."""
+    stat_cache.prefetch(p for _, p in path_checks)
+    for spec, p in path_checks:
+        if spec.path_check == PATH_CHECK.FILE and not stat_cache.isfile(p):
+            raise InputError(f"{spec.name} {p} does not exist!")
+        if spec.path_check == PATH_CHECK.EXISTS and not stat_cache.exists(p):
+            raise InputError(f"{spec.name} {p} does not exist!")
+
+
+def _entries(spec: InputSpec, value: Any) -> Any:
+    if spec.kind == INPUT_KIND.DATA_LIST:
+        return [f"{source};{target}" for source, target in value]
+    if spec.kind == INPUT_KIND.TARGET_LIST:
+        return [";".join(target).rstrip(";") for target in value]
+    return value
+
+
+def format_input(spec: InputSpec, value: Any) -> str:
+    if spec.kind == INPUT_KIND.BOOL:
+        return "true" if value else "false"
+    value = _entries(spec, value)
+    return "\n".join(value) if isinstance(value, list) else value
+
+
+def parse_inputs(schema: tuple[InputSpec, ...], env_storage: Any, stat_cache: Optional[StatCache] = None) -> dict[str, Any]:
+    """Parse and normalize all inputs of schema in one pass, in schema order, then check all paths at once."""
+    values: dict[str, Any] = {}
+    path_checks: list[tuple[InputSpec, str]] = []
+    for spec in schema:
+        values[spec.name] = parse_input(spec, getattr(env_storage, spec.env), values, path_checks)
+    check_paths(path_checks, stat_cache if stat_cache is not None else StatCache())
+    return values
+
+
+def write_outputs(schema: tuple[InputSpec, ...], values: dict[str, Any], output_storage: Any) -> None:
+    for spec in schema:
+        if spec.output is not None:
+            setattr(output_storage, spec.output, format_input(spec, values[spec.name]))
+
+
+def env_annotations(schema: tuple[InputSpec, ...]) -> dict[str, type]:
+    return {spec.env: str for spec in schema}
+
+
+def output_annotations(schema: tuple[InputSpec, ...]) -> dict[str, type]:
+    return {spec.output: str for spec in schema if spec.output is not None}
@@ -1,28 +1,116 @@
-# V1.0
+# V1.1
 
 from __future__ import annotations
+from contextlib import contextmanager
 from os import environ
-from typing import Any, get_type_hints
+from typing import Any, Callable, Iterator, get_type_hints
+
+
+_pending_writes: dict[str, list[str]] | None = None
+
+
+def _write(file_env_name: str, name: str, st: str) -> None:
+    entry = f"{name}<<EOF\n{st}\nEOF\n"
+    if _pending_writes is not None:
+        _pending_writes.setdefault(file_env_name, []).append(entry)
+        return
+    with open(environ[file_env_name], "a") as f:
+        f.write(entry)
+
+
+@contextmanager
+def batch_writes() -> Iterator[None]:
+    """Collect all GITHUB_ENV/GITHUB_OUTPUT writes and commit them with a single write per file on success.
+
+    If the block raises, the collected writes are discarded."""
+    global _pending_writes
+    if _pending_writes is not None:
+        yield
+        return
+
+    _pending_writes = {}
+    try:
+        yield
+        pending = _pending_writes
+    finally:
+        _pending_writes = None
+
+    for file_env_name, entries in pending.items():
+        with open(environ[file_env_name], "a") as f:
+            f.write("".join(entries))
+
+
+class MissingENVVariables(KeyError):
+    def __init__(self, names: list[str], *args: Any):
+        super().__init__(f"missing environment variable(s): {', '.join(names)}", *args)
+        self.names = names
+
+    def __str__(self) -> str:
+        return str(self.args[0])
+
+
+def _convert_bool(st: str) -> bool:
+    return st == "true"
+
+
+_CONVERTERS: dict[Any, Callable[[str], Any]] = {bool: _convert_bool}
 
 
 class __GithubENVManagerMeta(type):
+    _converters: dict[str, Callable[[str], Any]] | None
+    _values: dict[str, Any]
+
     def __new__(cls, name: str, bases: tuple[type, ...], dct: dict[str, str]) -> __GithubENVManagerMeta:
         x = super().__new__(cls, name, bases, dct)
+        x._values = {}
+        try:
+            x._converters = x._resolve_converters()
+        except NameError:
+            # forward references are resolved on first access instead
+            x._converters = None
         return x
 
+    def _resolve_converters(self) -> dict[str, Callable[[str], Any]]:
+        return {name: _CONVERTERS.get(hint, hint) for name, hint in get_type_hints(self).items()}
+
+    def _get_converters(self) -> dict[str, Callable[[str], Any]]:
+        if self._converters is None:
+            self._converters = self._resolve_converters()
+        return self._converters
+
+    def load(self) -> None:
+        """Read and convert all declared variables at once, reporting every missing one."""
+        converters = self._get_converters()
+        missing = [name for name in converters if name not in environ]
+        if len(missing) > 0:
+            raise MissingENVVariables(missing)
+        for name, converter in converters.items():
+            self._values[name] = converter(environ[name])
+
     def __getattribute__(self, name: str) -> Any:
-        if name.startswith("__") and name.endswith("__"):
+        if name.startswith("__") and name.endswith("__") or name in _ENV_META_ATTRIBUTES:
             return super().__getattribute__(name)
 
-        if name not in self.__annotations__.keys():
+        values = self._values
+        if name in values:
+            return values[name]
+
+        converters = self._get_converters()
+        if name not in converters:
             raise AttributeError(f"invalid attribute {name}")
 
-        st = environ[name]
+        if name not in environ:
+            raise MissingENVVariables([name])
 
-        return get_type_hints(self)[name](st)
+        value = values[name] = converters[name](environ[name])
+        return value
 
     def __setattr__(self, name: str, value: Any) -> None:
-        if name not in self.__annotations__.keys():
+        if name in _ENV_META_ATTRIBUTES:
+            super().__setattr__(name, value)
+            return
+
+        if name not in self._get_converters():
             raise AttributeError(f"invalid attribute {name}")
 
         if type(value) == bool:
@@ -31,8 +119,11 @@ class __GithubENVManagerMeta(type):
             st = str(value)
 
         environ[name] = st
-        with open(environ["GITHUB_ENV"], "a") as f:
-            f.write(f"{name}<<EOF\n{st}\nEOF\n")
+        self._values.pop(name, None)
+        _write("GITHUB_ENV", name, st)
+
+
+_ENV_META_ATTRIBUTES = frozenset(("_converters", "_values", "_resolve_converters", "_get_converters", "load"))
 
 
 class GithubENVManager(metaclass=__GithubENVManagerMeta):
@@ -71,8 +162,7 @@ class __GithubOutputManagerMeta(type):
         else:
             st = str(value)
 
-        with open(environ["GITHUB_OUTPUT"], "a") as f:
-            f.write(f"{name}<<EOF\n{st}\nEOF\n")
+        _write("GITHUB_OUTPUT", name, st)
 
 
 class GithubOutputManager(metaclass=__GithubOutputManagerMeta):
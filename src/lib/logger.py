@@ -1,38 +1,128 @@
-# V1.4
+# V1.7
 
 from __future__ import annotations
 from io import TextIOBase, TextIOWrapper
 import logging
-from typing import Any, BinaryIO, Optional, cast
+from typing import Any, BinaryIO, Callable, Optional, TypeVar, cast
 from sys import stderr
-from os import devnull, getpid, path, remove
+from os import O_APPEND, O_CREAT, O_EXCL, O_RDWR, O_WRONLY, close as os_close, devnull, getpid, linesep, name as os_name, open as os_open, path, remove, replace, stat, write as os_write
+from locale import getpreferredencoding
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+_O_BINARY: int = getattr(os, "O_BINARY", 0)
+from shutil import copyfileobj
+from threading import Thread, get_ident, local
+from time import monotonic
+from functools import partial, wraps
+from queue import Empty, Full, Queue
+import atexit
+import gzip
 from enum import Enum
-from glob import glob
-from datetime import datetime
+from glob import escape as glob_escape, glob
+from datetime import datetime, timedelta
 import warnings
 
-# region code from snippets V2.0
+# region code from snippets V2.1
 
 # fmt: off
+from enum import Enum
+class DURABILITY(Enum):
+# fmt: on
+    ALWAYS = 0
+    """flush and fsync after every write"""
+    GROUP_COMMIT = 1
+    """flush after every write, fsync from a background thread every group_commit_interval_ms or after group_commit_bytes"""
+    ON_CLOSE = 2
+    """flush after every write, fsync only on close and at interpreter exit"""
+
+
+# fmt: off
+import atexit
+import weakref
+from functools import partial
 from io import TextIOWrapper
 from os import path, fsync
+from threading import Event, RLock, Thread
 class FileAutoSave(TextIOWrapper):
 # fmt: on
     @property
     def path(self) -> str:
         return path.abspath(self._path)
 
-    def __init__(self, path: str, *args: Any, **kwargs: Any):
+    def __init__(self, path: str, *args: Any, durability: DURABILITY = DURABILITY.ALWAYS, group_commit_interval_ms: int = 1000, group_commit_bytes: int = 64 * 1024, **kwargs: Any):
+        self._durability = durability
+        self._group_commit_bytes = group_commit_bytes
+        self._unsynced_bytes = 0
+        self._lock = RLock()
+        self._group_commit_stop = Event()
+        self._sync_at_exit_hook: Optional[Callable[[], None]] = None
         super().__init__(open(path, "a").detach(), *args, **kwargs)
         self._path: str = path
 
+        if durability == DURABILITY.GROUP_COMMIT:
+            Thread(target=FileAutoSave._group_commit_loop, args=(weakref.ref(self), self._group_commit_stop, group_commit_interval_ms / 1000),
+                   name="FileAutoSave-group-commit", daemon=True).start()
+        if durability != DURABILITY.ALWAYS:
+            # a partial of its own so close() unregisters only this file's hook
+            self._sync_at_exit_hook = partial(FileAutoSave._sync_at_exit, weakref.ref(self))
+            atexit.register(self._sync_at_exit_hook)
+
+    @staticmethod
+    def _group_commit_loop(file_ref: weakref.ref[FileAutoSave], stop: Event, interval: float) -> None:
+        while not stop.wait(interval):
+            file = file_ref()
+            if file is None:
+                return
+            file._sync(only_pending=True)
+            del file
+
+    @staticmethod
+    def _sync_at_exit(file_ref: weakref.ref[FileAutoSave]) -> None:
+        file = file_ref()
+        if file is not None:
+            file._sync(only_pending=True)
+
+    def _sync(self, only_pending: bool = False) -> None:
+        with self._lock:
+            if self.closed or only_pending and self._unsynced_bytes == 0:
+                return
+            self.flush()
+            fsync(self.fileno())
+            self._unsynced_bytes = 0
+
+    @property
+    def durability(self) -> DURABILITY:
+        return self._durability
+
     def __del__(self):
         self.close()
 
+    def close(self) -> None:
+        if "_lock" not in self.__dict__:
+            return super().close()
+        self._group_commit_stop.set()
+        if self._sync_at_exit_hook is not None:
+            atexit.unregister(self._sync_at_exit_hook)
+            self._sync_at_exit_hook = None
+        self._sync(only_pending=True)
+        with self._lock:
+            super().close()
+
     def write(self, text: str) -> int:
-        t_return = super().write(text)
-        self.flush()
-        fsync(self.fileno())
+        with self._lock:
+            t_return = super().write(text)
+            # every write reaches the os right away, the durability policy only defers fsync
+            self.flush()
+            if self._durability == DURABILITY.ALWAYS:
+                fsync(self.fileno())
+            else:
+                self._unsynced_bytes += t_return
+                if self._durability == DURABILITY.GROUP_COMMIT and self._unsynced_bytes >= self._group_commit_bytes:
+                    self._sync()
         return t_return
 
 
@@ -83,6 +173,15 @@ class LOG_LEVEL(Enum):
     ERROR = 40
     CRITICAL = 50
 
+
+class OVERFLOW_POLICY(Enum):
+    BLOCK = 0
+    """wait until the writer thread made room"""
+    DROP_OLDEST = 1
+    """discard the oldest queued record"""
+    DROP_DEBUG = 2
+    """discard the new record if it is a debug record, otherwise wait"""
+
 # endregion
 
 
@@ -134,7 +233,7 @@ class LogStreamWrapper(TextIOWrapper, LogStreamBase):  # type: ignore
 
 
 class LogFile(FileAutoSave, LogStreamWrapper):
-    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", clear_logfile: bool = False):
+    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", clear_logfile: bool = False, durability: DURABILITY = DURABILITY.ALWAYS, group_commit_interval_ms: int = 1000, group_commit_bytes: int = 64 * 1024):
         self._path = file_path = convert_relpath_to_script_abspath(file_path)
 
         if check_file_already_open(file_path):
@@ -144,14 +243,10 @@ class LogFile(FileAutoSave, LogStreamWrapper):
             if path.exists(file_path):
                 remove(file_path)
 
-        t_newlines = False
-        if path.exists(file_path):
-            with open(file_path, "r") as f:
-                if f.read() != "":
-                    t_newlines = True
+        t_newlines = path.exists(file_path) and path.getsize(file_path) > 0
 
         super().__init__(file_path,
-                         init_message=False)
+                         init_message=False, durability=durability, group_commit_interval_ms=group_commit_interval_ms, group_commit_bytes=group_commit_bytes)
 
         if t_newlines:
             self.write("\n"*blank_lines)
@@ -165,7 +260,7 @@ class LogFile(FileAutoSave, LogStreamWrapper):
 
 
 class LogFileOnDemand(LogStreamBase):
-    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", clear_logfile: bool = False):
+    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", clear_logfile: bool = False, durability: DURABILITY = DURABILITY.ALWAYS, group_commit_interval_ms: int = 1000, group_commit_bytes: int = 64 * 1024):
         super().__init__(init_message=False)
         file_path = convert_relpath_to_script_abspath(file_path)
         self._stream: LogFile | None = None
@@ -175,16 +270,23 @@ class LogFileOnDemand(LogStreamBase):
         self._app_name = app_name
         self._init_message_suffix = init_message_suffix
         self._clear_logfile = clear_logfile
+        self._durability = durability
+        self._group_commit_interval_ms = group_commit_interval_ms
+        self._group_commit_bytes = group_commit_bytes
 
     def close(self):
         if self._stream != None:
             self._stream.close()
             self._stream = None
 
+    def _open_stream(self) -> LogFile:
+        return LogFile(self._path, blank_lines=self._blank_lines,
+                       init_message=self._init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix, clear_logfile=self._clear_logfile,
+                       durability=self._durability, group_commit_interval_ms=self._group_commit_interval_ms, group_commit_bytes=self._group_commit_bytes)
+
     def write(self, text: str) -> int:
         if self._stream == None:
-            self._stream = LogFile(self._path, blank_lines=self._blank_lines,
-                                   init_message=self._init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix, clear_logfile=self._clear_logfile)
+            self._stream = self._open_stream()
         return self._stream.write(text)
 
     def flush(self) -> None:
@@ -197,31 +299,221 @@ class LogFileOnDemand(LogStreamBase):
         return self._path
 
 
+class RotatingLogFile(LogFileOnDemand):
+    def __init__(self, file_path: str, *, max_bytes: int = 10 * 1024 * 1024, max_backups: int = 5, blank_lines: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", clear_logfile: bool = False, durability: DURABILITY = DURABILITY.ALWAYS, group_commit_interval_ms: int = 1000, group_commit_bytes: int = 64 * 1024):
+        """Log file that is rotated to file_path.1.gz ... file_path.<max_backups>.gz once it grows beyond roughly max_bytes.
+        Rotated segments are gzip-compressed by a background thread."""
+        super().__init__(file_path, blank_lines=blank_lines, init_message=init_message, app_name=app_name, init_message_suffix=init_message_suffix, clear_logfile=clear_logfile,
+                         durability=durability, group_commit_interval_ms=group_commit_interval_ms, group_commit_bytes=group_commit_bytes)
+        self._max_bytes = max_bytes
+        self._max_backups = max_backups
+        self._size = 0
+        self._compression_thread: Thread | None = None
+
+    @staticmethod
+    def _compress_segment(src: str, dst: str) -> None:
+        with open(src, "rb") as f_in, gzip.open(f"{dst}.tmp", "wb") as f_out:
+            copyfileobj(f_in, f_out)
+        replace(f"{dst}.tmp", dst)
+        remove(src)
+
+    def _wait_for_compression(self) -> None:
+        if self._compression_thread is not None:
+            self._compression_thread.join()
+            self._compression_thread = None
+
+    def _rotate(self) -> None:
+        super().close()
+        self._wait_for_compression()
+        if self._max_backups <= 0:
+            remove(self._path)
+            return
+        for i in range(self._max_backups - 1, 0, -1):
+            if path.exists(t_backup := f"{self._path}.{i}.gz"):
+                replace(t_backup, f"{self._path}.{i + 1}.gz")
+        replace(self._path, t_segment := f"{self._path}.1")
+        self._compression_thread = Thread(target=RotatingLogFile._compress_segment, args=(t_segment, f"{t_segment}.gz"), name="RotatingLogFile-compress")
+        self._compression_thread.start()
+
+    def close(self):
+        super().close()
+        self._wait_for_compression()
+
+    def _open_stream(self) -> LogFile:
+        t_stream = super()._open_stream()
+        self._size = t_stream.tell()
+        return t_stream
+
+    def write(self, text: str) -> int:
+        if self._stream != None and self._size > 0 and self._size + len(text) > self._max_bytes:
+            self._rotate()
+        t_return = super().write(text)
+        self._size += len(text)
+        return t_return
+
+
+class ConcurrentLogFile(LogStreamBase):
+    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", lock: bool = os_name == "nt", durability: DURABILITY = DURABILITY.ALWAYS):
+        """Log file that can be shared by several processes. Every record is written with a single O_APPEND write,
+        optionally under an advisory lock that is only held for that write (required on Windows, where appends are not atomic)."""
+        if durability == DURABILITY.GROUP_COMMIT:
+            raise ValueError("ConcurrentLogFile does not support DURABILITY.GROUP_COMMIT")
+        self._path = file_path = convert_relpath_to_script_abspath(file_path)
+        self._durability = durability
+        self._encoding = getpreferredencoding(False)
+        self._fd = os_open(file_path, O_WRONLY | O_CREAT | O_APPEND | _O_BINARY)
+        self._lock_fd: int | None = None
+        if lock:
+            self._lock_fd = os_open(f"{file_path}.lock", O_RDWR | O_CREAT | _O_BINARY) if fcntl is None else self._fd
+        super().__init__(init_message=False)
+
+        if path.getsize(file_path) > 0:
+            self.write("\n"*blank_lines)
+
+        if init_message:
+            self._write_init_message(app_name, init_message_suffix)
+
+    def __lock(self) -> None:
+        if self._lock_fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self._lock_fd, msvcrt.LK_LOCK, 1)
+
+    def __unlock(self) -> None:
+        if self._lock_fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+
+    def write(self, text: str) -> int:
+        t_data = text.replace("\n", linesep).encode(self._encoding, "replace")
+        self.__lock()
+        try:
+            # os.write may write less than asked (full disk, signals), the rest follows under the same lock
+            t_view = memoryview(t_data)
+            while len(t_view) > 0:
+                if (t_written := os_write(self._fd, t_view)) == 0:
+                    raise OSError(f"could not write to {self._path}")
+                t_view = t_view[t_written:]
+            if self._durability == DURABILITY.ALWAYS:
+                fsync(self._fd)
+        finally:
+            self.__unlock()
+        return len(text)
+
+    def close(self) -> None:
+        if getattr(self, "_fd", None) is None:
+            return
+        if self._durability != DURABILITY.ALWAYS:
+            fsync(self._fd)
+        if self._lock_fd is not None and self._lock_fd != self._fd:
+            os_close(self._lock_fd)
+        os_close(self._fd)
+        self._fd = None
+        super().close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+
 class CrashLogFile(LogFileOnDemand):
-    def __init__(self, file_path_praefix: str, file_path_suffix: str, *, file_number_digits: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = ""):
-        super().__init__("", init_message=init_message, app_name=app_name, init_message_suffix=init_message_suffix)
+    def __init__(self, file_path_praefix: str, file_path_suffix: str, *, file_number_digits: int = 3, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", max_crash_logs: int | None = None, max_age: timedelta | None = None, max_total_size: int | None = None, durability: DURABILITY = DURABILITY.ALWAYS, group_commit_interval_ms: int = 1000, group_commit_bytes: int = 64 * 1024):
+        super().__init__("", init_message=init_message, app_name=app_name, init_message_suffix=init_message_suffix,
+                         durability=durability, group_commit_interval_ms=group_commit_interval_ms, group_commit_bytes=group_commit_bytes)
         file_path_praefix = convert_relpath_to_script_abspath(file_path_praefix)
         self.__file_path_praefix = file_path_praefix
         self.__file_path_suffix = file_path_suffix
         self.__file_number_digits = file_number_digits
+        self.__index_path = f"{file_path_praefix}index"
+        self.__max_crash_logs = max_crash_logs
+        self.__max_age = max_age
+        self.__max_total_size = max_total_size
+
+    def __existing_crash_logs(self) -> list[tuple[int, str]]:
+        t_crash_logs: list[tuple[int, str]] = []
+        for t_path in glob(f"{glob_escape(self.__file_path_praefix)}[0-9]*{glob_escape(self.__file_path_suffix)}"):
+            t_num = t_path.removeprefix(self.__file_path_praefix).removesuffix(self.__file_path_suffix)
+            if t_num.isdigit():
+                t_crash_logs.append((int(t_num), t_path))
+        t_crash_logs.sort()
+        return t_crash_logs
+
+    def __read_index(self) -> int | None:
+        try:
+            with open(self.__index_path, "r") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def __write_index(self, num: int) -> None:
+        t_tmp_path = f"{self.__index_path}.{getpid()}.{get_ident()}.tmp"
+        with open(t_tmp_path, "w") as f:
+            f.write(str(num))
+        replace(t_tmp_path, self.__index_path)
+
+    def __allocate_path(self) -> str:
+        t_num = self.__read_index()
+        if t_num is None:
+            t_crash_logs = self.__existing_crash_logs()
+            t_num = t_crash_logs[-1][0] + 1 if len(t_crash_logs) > 0 else 1
+
+        while True:
+            t_path = f"{self.__file_path_praefix}{str(t_num).zfill(self.__file_number_digits)}{self.__file_path_suffix}"
+            try:
+                # exclusive create, so concurrently crashing processes never share a number
+                os_close(os_open(t_path, O_CREAT | O_EXCL | O_WRONLY))
+                break
+            except FileExistsError:
+                t_num += 1
+
+        self.__write_index(t_num + 1)
+        return t_path
+
+    def __apply_retention(self, current_path: str) -> None:
+        if self.__max_crash_logs is None and self.__max_age is None and self.__max_total_size is None:
+            return
+
+        t_crash_logs = [(t_path, stat(t_path)) for _, t_path in self.__existing_crash_logs() if t_path != current_path]
+        t_remove: list[str] = []
+
+        if self.__max_age is not None:
+            t_min_mtime = (datetime.now() - self.__max_age).timestamp()
+            t_remove.extend(t_path for t_path, t_stat in t_crash_logs if t_stat.st_mtime < t_min_mtime)
+            t_crash_logs = [(t_path, t_stat) for t_path, t_stat in t_crash_logs if t_stat.st_mtime >= t_min_mtime]
+
+        if self.__max_crash_logs is not None:
+            # the new crash log counts against the limit, the cut is clamped for fewer logs than that
+            t_cut = max(len(t_crash_logs) - max(self.__max_crash_logs - 1, 0), 0)
+            t_remove.extend(t_path for t_path, _ in t_crash_logs[:t_cut])
+            t_crash_logs = t_crash_logs[t_cut:]
+
+        if self.__max_total_size is not None:
+            t_total_size = sum(t_stat.st_size for _, t_stat in t_crash_logs)
+            for t_path, t_stat in t_crash_logs:
+                if t_total_size <= self.__max_total_size:
+                    break
+                t_remove.append(t_path)
+                t_total_size -= t_stat.st_size
+
+        for t_path in t_remove:
+            try:
+                remove(t_path)
+            except FileNotFoundError:
+                pass
 
     def write(self, text: str) -> int:
         if self._stream == None:
-            t_crash_logs = glob(
-                f"{self.__file_path_praefix}[0-9]*{self.__file_path_suffix}")
-
-            t_num = 1
-            if len(t_crash_logs) > 0:
-                t_crash_logs.sort(reverse=True)
-                t_num = t_crash_logs[0].removeprefix(
-                    self.__file_path_praefix).removesuffix(self.__file_path_suffix)
-                t_num = int(t_num) + 1
-
-            t_path = f"{self.__file_path_praefix}\
-{str(t_num).zfill(self.__file_number_digits)}{self.__file_path_suffix}"
+            t_path = self.__allocate_path()
+            self.__apply_retention(t_path)
 
             self._stream = LogFile(
-                t_path, init_message=self._init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix)
+                t_path, init_message=self._init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix,
+                durability=self._durability, group_commit_interval_ms=self._group_commit_interval_ms, group_commit_bytes=self._group_commit_bytes)
 
         return super().write(text)
 
@@ -229,6 +521,11 @@ class CrashLogFile(LogFileOnDemand):
     def path(self) -> tuple[str, str]:  # type: ignore
         return self.__file_path_praefix, self.__file_path_suffix
 
+    @property
+    def crash_log_path(self) -> str | None:
+        """path of the crash log this file writes to, None until the first write allocates one"""
+        return self._stream.path if self._stream != None else None
+
 # endregion
 
 
@@ -241,19 +538,183 @@ class _MaxLogLevelFilter(logging.Filter):
         return True if record.levelno <= self.max_log_level.value else False
 
 
+# MARK: Formatter
+class _Formatter(logging.Formatter):
+    """Formatter that writes records logged by Logger.print with the raw message format."""
+    _raw_formatter = logging.Formatter("%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, _RAW_RECORD_ATTRIBUTE, False):
+            return self._raw_formatter.format(record)
+        return super().format(record)
+
+
+# MARK: async writer
+class _AsyncHandler(logging.Handler):
+    def __init__(self, target: logging.Handler, queue_size: int, overflow_policy: OVERFLOW_POLICY):
+        super().__init__()
+        self.target = target
+        self.overflow_policy = overflow_policy
+        self.__queue: Queue[logging.LogRecord | None] = Queue(queue_size)
+        self.__thread = Thread(target=self.__write_loop, name="Handler-async-writer", daemon=True)
+        self.__thread.start()
+        # a partial of its own so close() unregisters only this handler's hook
+        self.__close_at_exit: Optional[Callable[[], None]] = partial(_AsyncHandler.close, self)
+        atexit.register(self.__close_at_exit)
+
+    def __write_loop(self) -> None:
+        while True:
+            record = self.__queue.get()
+            try:
+                if record is None:
+                    return
+                self.target.handle(record)
+            finally:
+                self.__queue.task_done()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # level and filters are checked in the calling thread so rejected records never reach the queue
+        if record.levelno < self.target.level or not self.target.filter(record):
+            return False
+        # resolve the message now, the arguments might change before the writer thread formats the record
+        record.msg = record.getMessage()
+        record.args = None
+
+        if self.overflow_policy == OVERFLOW_POLICY.BLOCK:
+            self.__queue.put(record)
+            return True
+        while True:
+            try:
+                self.__queue.put_nowait(record)
+                return True
+            except Full:
+                if self.overflow_policy == OVERFLOW_POLICY.DROP_DEBUG:
+                    if record.levelno <= LOG_LEVEL.DEBUG.value:
+                        return False
+                    self.__queue.put(record)
+                    return True
+            try:
+                self.__queue.get_nowait()
+                self.__queue.task_done()
+            except Empty:
+                pass
+
+    def flush(self) -> None:
+        if self.__thread.is_alive():
+            self.__queue.join()
+
+    def close(self) -> None:
+        if self.__close_at_exit is not None:
+            atexit.unregister(self.__close_at_exit)
+            self.__close_at_exit = None
+        if self.__thread.is_alive():
+            self.__queue.put(None)
+            self.__thread.join()
+        super().close()
+
+
+# MARK: ring buffer
+class _RingBufferLoggingHandler(logging.Handler):
+    def __init__(self, crash_log: CrashLogFile, capacity: int, trigger_level: LOG_LEVEL):
+        super().__init__()
+        self.crash_log = crash_log
+        self.trigger_level = trigger_level
+        self.__capacity = capacity
+        self.__buffer: list[str | None] = [None] * capacity
+        self.__index = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.__buffer[self.__index] = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.__index = (self.__index + 1) % self.__capacity
+        if record.levelno >= self.trigger_level.value:
+            self.dump()
+
+    def dump(self) -> None:
+        with self.lock:  # type: ignore
+            t_records = [r for r in self.__buffer[self.__index:] + self.__buffer[:self.__index] if r is not None]
+            if len(t_records) == 0:
+                return
+            self.crash_log.write("".join(f"{r}\n" for r in t_records))
+            self.crash_log.flush()
+            self.__buffer[:] = [None] * self.__capacity
+            self.__index = 0
+
+
+# MARK: spans
+class Span:
+    """One timed section, start and end are time.monotonic() values."""
+    __slots__ = ("name", "depth", "parent", "start", "end")
+
+    def __init__(self, name: str, depth: int, parent: Optional[Span], start: float):
+        self.name = name
+        self.depth = depth
+        self.parent = parent
+        self.start = start
+        self.end: float | None = None
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, depth={self.depth}, duration={self.duration})"
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+class _SpanContext:
+    def __init__(self, logger: Logger, name: str):
+        self.__logger = logger
+        self.__name = name
+        self.__span: Span | None = None
+
+    def __enter__(self) -> Span:
+        t_stack: list[Span] = _span_stack.__dict__.setdefault("spans", [])
+        self.__span = Span(self.__name, len(t_stack), t_stack[-1] if len(t_stack) > 0 else None, monotonic())
+        t_stack.append(self.__span)
+        _spans.append(self.__span)
+        return self.__span
+
+    def __exit__(self, *exc_info: Any) -> None:
+        t_span = cast(Span, self.__span)
+        t_span.end = monotonic()
+        t_stack: list[Span] = _span_stack.spans
+        # spans closed out of order (e.g. by a generator) must not corrupt the stack of the others
+        if t_stack[-1] is t_span:
+            t_stack.pop()
+        else:
+            t_stack.remove(t_span)
+        self.__logger.debug("Span %s took %.3f s", t_span.name, t_span.duration)
+
+    def __call__(self, func: _F) -> _F:
+        # every call gets its own context, so recursive and concurrent calls nest correctly
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _SpanContext(self.__logger, self.__name):
+                return func(*args, **kwargs)
+        return cast(_F, wrapper)
+
+
 # region Handler
 
 class Handler:
-    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
+    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, async_mode: bool = False, queue_size: int = 10000, overflow_policy: OVERFLOW_POLICY = OVERFLOW_POLICY.BLOCK):
         self._handler: logging.Handler = getattr(self, "_handler", logging.Handler())
         self.__max_loglevel_filter = _MaxLogLevelFilter()
         self._handler.addFilter(self.__max_loglevel_filter)
+        self._root_handler: logging.Handler = _AsyncHandler(self._handler, queue_size, overflow_policy) if async_mode else self._handler
+        self.__enabled = False
         _handler.append(self)
         self.__attached = True
         self.__handle_exec_info = True
         self.handle_exec_info = handle_exec_info
-        self.enabled = True
         self.log_level = log_level
+        self.enabled = True
         self.max_log_level = max_log_level
         self.format = format
 
@@ -261,10 +722,19 @@ class Handler:
     def attached(self) -> bool:
         return self.__attached
 
+    @property
+    def async_mode(self) -> bool:
+        return self._root_handler is not self._handler
+
     def detach(self) -> Any:
         self.enabled = False
         _handler.remove(self)
         self.__attached = False
+        if self.async_mode:
+            self._root_handler.close()
+
+    def flush(self) -> None:
+        self._root_handler.flush()
 
     def __check_attached(self):
         if not self.__attached:
@@ -279,9 +749,10 @@ class Handler:
         self.__check_attached()
         self.__enabled = value
         if value:
-            logging.getLogger().addHandler(self._handler)
+            logging.getLogger().addHandler(self._root_handler)
         else:
-            logging.getLogger().removeHandler(self._handler)
+            logging.getLogger().removeHandler(self._root_handler)
+        _update_handler_state()
 
     @property
     def log_level(self) -> LOG_LEVEL:
@@ -291,6 +762,7 @@ class Handler:
     def log_level(self, level: LOG_LEVEL) -> None:
         self.__log_level = level
         self._handler.setLevel(level.value)
+        _update_handler_state()
 
     @property
     def max_log_level(self) -> LOG_LEVEL:
@@ -308,7 +780,7 @@ class Handler:
     @format.setter
     def format(self, format: str) -> None:
         self.__format = format
-        self._handler.setFormatter(logging.Formatter(self.__format))
+        self._handler.setFormatter(_Formatter(self.__format))
 
     @property
     def handle_exec_info(self) -> bool:
@@ -333,9 +805,9 @@ class Handler:
 
 
 class StreamHandlerBase(Handler):
-    def __init__(self, stream: LogStreamBase, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
+    def __init__(self, stream: LogStreamBase, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, async_mode: bool = False, queue_size: int = 10000, overflow_policy: OVERFLOW_POLICY = OVERFLOW_POLICY.BLOCK):
         self._handler = logging.StreamHandler(stream)
-        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, async_mode=async_mode, queue_size=queue_size, overflow_policy=overflow_policy)
 
     def detach(self) -> LogStreamBase:
         super().detach()
@@ -343,22 +815,39 @@ class StreamHandlerBase(Handler):
 
 
 class StreamHandler(StreamHandlerBase):
-    def __init__(self, stream: LogStreamBase, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        super().__init__(stream, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+    def __init__(self, stream: LogStreamBase, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, async_mode: bool = False, queue_size: int = 10000, overflow_policy: OVERFLOW_POLICY = OVERFLOW_POLICY.BLOCK):
+        super().__init__(stream, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, async_mode=async_mode, queue_size=queue_size, overflow_policy=overflow_policy)
 
     def detach(self) -> LogStreamBase:
         return super().detach()
 
 
 class StdErrHandler(StreamHandler):
-    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, init_message: bool = True, app_name: str = "", init_message_suffix: str = ""):
+    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, init_message: bool = True, app_name: str = "", init_message_suffix: str = "", async_mode: bool = False, queue_size: int = 10000, overflow_policy: OVERFLOW_POLICY = OVERFLOW_POLICY.BLOCK):
         super().__init__(LogStreamWrapper(stderr.buffer, init_message=init_message,
-                                          app_name=app_name, init_message_suffix=init_message_suffix), log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+                                          app_name=app_name, init_message_suffix=init_message_suffix), log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, async_mode=async_mode, queue_size=queue_size, overflow_policy=overflow_policy)
 
 
 class FileHandler(StreamHandlerBase):
-    def __init__(self, file: LogFile | LogFileOnDemand | CrashLogFile, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        super().__init__(file, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+    def __init__(self, file: LogFile | LogFileOnDemand | CrashLogFile | ConcurrentLogFile, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, async_mode: bool = False, queue_size: int = 10000, overflow_policy: OVERFLOW_POLICY = OVERFLOW_POLICY.BLOCK):
+        super().__init__(file, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, async_mode=async_mode, queue_size=queue_size, overflow_policy=overflow_policy)
+
+class RingBufferHandler(Handler):
+    def __init__(self, crash_log: CrashLogFile, log_level: LOG_LEVEL = LOG_LEVEL.DEBUG, *, capacity: int = 1000, trigger_level: LOG_LEVEL = LOG_LEVEL.ERROR, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
+        """Keeps the last capacity formatted records in memory and writes them to crash_log in one write
+        once a record at or above trigger_level arrives or dump() is called."""
+        self._handler = _RingBufferLoggingHandler(crash_log, capacity, trigger_level)
+        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+
+    def dump(self) -> str | None:
+        """Write the buffered records to the crash log, returns its path or None if nothing was ever written to it."""
+        t_handler = cast(_RingBufferLoggingHandler, self._handler)
+        t_handler.dump()
+        return t_handler.crash_log.crash_log_path
+
+    def detach(self) -> CrashLogFile:
+        super().detach()
+        return cast(_RingBufferLoggingHandler, self._handler).crash_log
 
 # endregion
 
@@ -368,45 +857,62 @@ class Logger:
     def __init__(self, name: str):
         self.__logger = logging.getLogger(name)
 
+    def _log(self, level: int, log_objs: tuple[object, ...], **kwargs: Any) -> None:
+        if len(log_objs) == 1 and callable(log_objs[0]):
+            log_objs = (log_objs[0](),)
+        self.__logger.log(level, *log_objs, **kwargs)
+
     def debug(self, *log_objs: object) -> None:
-        _check_has_handler()
-        self.__logger.debug(*log_objs)
+        """log_objs is either a message with optional %-style args or a single callable returning the message,
+        which is only called if a handler accepts the level."""
+        if _min_log_level <= _DEBUG:
+            self._log(_DEBUG, log_objs)
+        elif _enabled_handler_count == 0:
+            _warn_no_handler()
 
     def info(self, *log_objs: object) -> None:
-        _check_has_handler()
-        self.__logger.info(*log_objs)
+        if _min_log_level <= _INFO:
+            self._log(_INFO, log_objs)
+        elif _enabled_handler_count == 0:
+            _warn_no_handler()
 
     def warning(self, *log_objs: object) -> None:
-        _check_has_handler()
-        self.__logger.warning(*log_objs)
+        if _min_log_level <= _WARNING:
+            self._log(_WARNING, log_objs)
+        elif _enabled_handler_count == 0:
+            _warn_no_handler()
 
     def error(self, *log_objs: object) -> None:
-        _check_has_handler()
-        self.__logger.error(*log_objs)
+        if _min_log_level <= _ERROR:
+            self._log(_ERROR, log_objs)
+        elif _enabled_handler_count == 0:
+            _warn_no_handler()
 
     def critical(self, *log_objs: object) -> None:
-        _check_has_handler()
-        self.__logger.critical(*log_objs)
+        if _min_log_level <= _CRITICAL:
+            self._log(_CRITICAL, log_objs)
+        elif _enabled_handler_count == 0:
+            _warn_no_handler()
 
     def exception(self, *log_objs: object) -> None:
-        _check_has_handler()
-        self.__logger.critical(*log_objs, exc_info=True)
+        if _min_log_level <= _CRITICAL:
+            self._log(_CRITICAL, log_objs, exc_info=True)
+        elif _enabled_handler_count == 0:
+            _warn_no_handler()
 
     def print(self, *log_objs: object, simulated_loglevel: LOG_LEVEL = LOG_LEVEL.CRITICAL) -> None:
         """Send log_objs to all handlers without formatting."""
-        _check_has_handler()
-
-        handlers: dict[logging.Handler, logging.Formatter | None] = {}
-
-        for handler in logging.getLogger().handlers:
-            formatter = handler.formatter
-            handler.setFormatter(logging.Formatter("%(message)s"))
-            handlers[handler] = formatter
+        if _min_log_level > simulated_loglevel.value:
+            if _enabled_handler_count == 0:
+                _warn_no_handler()
+            return
 
-        self.__logger.log(simulated_loglevel.value, *log_objs)
+        self._log(simulated_loglevel.value, log_objs, extra={_RAW_RECORD_ATTRIBUTE: True})
 
-        for handler, formatter in handlers.items():
-            handler.setFormatter(formatter)
+    def span(self, name: str) -> _SpanContext:
+        """Time a section, usable as context manager and as decorator. Spans opened inside another span of the
+        same thread are nested in it, all spans can be read with get_spans()."""
+        return _SpanContext(self, name)
 
     @property
     def disabled(self) -> bool:
@@ -419,25 +925,49 @@ class Logger:
 
 # region module methods
 
-def _check_has_handler() -> None:
+def _warn_no_handler() -> None:
     global _no_handlers_warning_issued
-    t_handler: list[Handler] = _handler
-
-    for h in t_handler:
-        if h.enabled:
-            _no_handlers_warning_issued = False
-            return
 
     if not _no_handlers_warning_issued:
         warnings.warn("Logger hat keine Handler!")
         _no_handlers_warning_issued = True
 
+
+def get_spans() -> list[Span]:
+    """All spans in the order they were started, unfinished ones have no end."""
+    return list(_spans)
+
+
+def clear_spans() -> None:
+    _spans.clear()
+
+
+def _update_handler_state() -> None:
+    """Recompute the enabled handler count and the lowest enabled log level, called whenever a handler changes."""
+    global _enabled_handler_count, _min_log_level, _no_handlers_warning_issued
+    t_levels = [h.log_level.value for h in _handler if h.enabled]
+    _enabled_handler_count = len(t_levels)
+    _min_log_level = min(t_levels, default=_DISABLED_LOG_LEVEL)
+    if _enabled_handler_count > 0:
+        _no_handlers_warning_issued = False
+
 # endregion
 
 
 # MARK: module init
 _handler: list[Handler] = []
+_RAW_RECORD_ATTRIBUTE = "raw_output"
 _no_handlers_warning_issued = False
+_DEBUG = LOG_LEVEL.DEBUG.value
+_INFO = LOG_LEVEL.INFO.value
+_WARNING = LOG_LEVEL.WARNING.value
+_ERROR = LOG_LEVEL.ERROR.value
+_CRITICAL = LOG_LEVEL.CRITICAL.value
+_DISABLED_LOG_LEVEL = _CRITICAL + 1
+_enabled_handler_count = 0
+_min_log_level = _DISABLED_LOG_LEVEL
+_spans: list[Span] = []
+_span_stack = local()
 logging.lastResort = logging.StreamHandler(open(devnull, "w"))
 logging.basicConfig(handlers=(), level=LOG_LEVEL.NOTSET.value)
 warnings.filterwarnings("always", ".*", category=UserWarning)
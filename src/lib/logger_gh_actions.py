@@ -1,16 +1,87 @@
-# V1.3
+# V1.4
 
 
+import atexit
 from sys import stderr, stdout
+from threading import Event, RLock, Thread
+from time import sleep
+from typing import TextIO
 from .logger import LOG_LEVEL, LogStreamBase, StreamHandler
 
 
+def escape_data(message: str) -> str:
+    """Escape a workflow command message, so multi-line messages stay one command."""
+    return message.replace("%", "%25").replace("\r", "%0D").replace("\n", "%0A")
+
+
+def _command(command: str, message: str) -> str:
+    if message.endswith("\n"):
+        return f"::{command}::{escape_data(message[:-1])}\n"
+    return f"::{command}::{escape_data(message)}"
+
+
+class _BufferedWriter:
+    """Coalesces the writes of all github streams. The buffer is written when it reaches max_buffer_size,
+    max_delay seconds after the first buffered write, when the target stream changes, at group boundaries and at exit."""
+
+    def __init__(self, max_buffer_size: int = 64 * 1024, max_delay: float = 0.2):
+        self.max_buffer_size = max_buffer_size
+        self.max_delay = max_delay
+        self.__lock = RLock()
+        self.__stream: TextIO | None = None
+        self.__buffer: list[str] = []
+        self.__buffer_size = 0
+        self.__pending = Event()
+        self.__flusher: Thread | None = None
+
+    def __flush_loop(self) -> None:
+        while True:
+            self.__pending.wait()
+            self.__pending.clear()
+            sleep(self.max_delay)
+            self.flush()
+
+    def write(self, stream: TextIO, text: str) -> None:
+        with self.__lock:
+            if stream is not self.__stream:
+                # keep the order between stdout and stderr
+                self.flush()
+                self.__stream = stream
+            self.__buffer.append(text)
+            self.__buffer_size += len(text)
+            if self.__buffer_size >= self.max_buffer_size:
+                self.flush()
+            elif len(self.__buffer) == 1:
+                if self.__flusher is None:
+                    self.__flusher = Thread(target=self.__flush_loop, name="github-stream-flusher", daemon=True)
+                    self.__flusher.start()
+                self.__pending.set()
+
+    def flush(self) -> None:
+        with self.__lock:
+            if self.__stream is None or len(self.__buffer) == 0:
+                return
+            self.__stream.write("".join(self.__buffer))
+            self.__stream.flush()
+            self.__buffer.clear()
+            self.__buffer_size = 0
+
+
+_writer = _BufferedWriter()
+atexit.register(_writer.flush)
+
+
+def flush_github_streams() -> None:
+    """Write everything the github streams buffered, e.g. before printing to stdout/stderr directly."""
+    _writer.flush()
+
+
 class GithubErrorStream(LogStreamBase):
     def __init__(self):
         super().__init__(init_message=False)
 
     def write(self, message: str) -> int:
-        print(f"::error::{message}", file=stderr, flush=True, end="")
+        _writer.write(stderr, _command("error", message))
         return len(message)
 
 
@@ -19,7 +90,7 @@ class GithubWarningStream(LogStreamBase):
         super().__init__(init_message=False)
 
     def write(self, message: str) -> int:
-        print(f"::warning::{message}", file=stderr, flush=True, end="")
+        _writer.write(stderr, _command("warning", message))
         return len(message)
 
 
@@ -28,7 +99,7 @@ class GithubInfoStream(LogStreamBase):
         super().__init__(init_message=False)
 
     def write(self, message: str) -> int:
-        print(f"::notice::{message}", file=stdout, flush=True, end="")
+        _writer.write(stdout, _command("notice", message))
         return len(message)
 
 
@@ -37,7 +108,7 @@ class GithubDebugStream(LogStreamBase):
         super().__init__(init_message=init_message, app_name=app_name)
 
     def write(self, message: str) -> int:
-        print(f"{message}", file=stdout, flush=True, end="")
+        _writer.write(stdout, message)
         return len(message)
 
 
@@ -56,8 +127,10 @@ def use_std_config(app_name: str = "") -> tuple[StreamHandler, StreamHandler, St
 
 
 def start_log_group(name: str):
-    print(f"::group::{name}", flush=True)
+    _writer.write(stdout, f"::group::{name}\n")
+    _writer.flush()
 
 
 def end_log_group():
-    print("::endgroup::")
+    _writer.write(stdout, "::endgroup::\n")
+    _writer.flush()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+from importlib.metadata import Distribution, distributions
+from os import path
+from sys import exc_info, stderr
+from traceback import format_exc
+from typing import Iterable, Optional
+from lib.github_storage_manager import GithubENVManager, GithubOutputManager, batch_writes
+
+from lib.logger_gh_actions import flush_github_streams, use_std_config
+from lib.logger import Logger
+
+try:
+    from packaging.markers import default_environment
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.utils import canonicalize_name
+    from packaging.version import InvalidVersion, Version
+except ImportError:
+    from pip._vendor.packaging.markers import default_environment
+    from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+    from pip._vendor.packaging.utils import canonicalize_name
+    from pip._vendor.packaging.version import InvalidVersion, Version
+
+
+def print_to_err(x: str) -> None:
+    return print(x, file=stderr)
+
+
+class ENVStorage(GithubENVManager):
+    PYTHON_REQUIREMENTS_FILE_PATH: str
+    ADDITIONAL_REQUIREMENTS: str
+    MISSING_REQUIREMENTS_FILE_PATH: str
+
+
+class OutputStorage(GithubOutputManager):
+    missing_requirements_file_path: str
+    missing_requirements_count: int
+
+
+logger: Logger
+
+REQUIREMENTS_INCLUDE_OPTIONS = ("-r", "--requirement", "-c", "--constraint")
+
+
+def parse_requirements_include(line: str) -> str | None:
+    for option in REQUIREMENTS_INCLUDE_OPTIONS:
+        if not line.startswith(option):
+            continue
+        include = line[len(option):]
+        if include.startswith("="):
+            include = include[1:]
+        elif option.startswith("--") and not include[:1].isspace():
+            continue
+        if (include := include.strip()) != "":
+            return include
+    return None
+
+
+def read_requirements(python_requirements_file: str) -> tuple[list[str], list[str]]:
+    """Return the requirement lines and the option lines of a requirements file with all -r includes resolved."""
+    requirements: list[str] = []
+    options: list[str] = []
+    visited: set[str] = set()
+
+    def visit(file: str) -> None:
+        file = path.abspath(file)
+        if path.normcase(file) in visited:
+            return
+        visited.add(path.normcase(file))
+        with open(file, "r", encoding="utf-8") as f:
+            lines = f.read().replace("\\\n", "").splitlines()
+        for line in lines:
+            if line.startswith("#"):
+                continue
+            line = line.split(" #", 1)[0].strip()
+            if line == "":
+                continue
+            if (include := parse_requirements_include(line)) is not None:
+                include = path.join(path.dirname(file), include)
+                if line.startswith(("-c", "--constraint")):
+                    options.append(f'--constraint "{path.abspath(include)}"')
+                else:
+                    visit(include)
+            elif line.startswith("-") and not line.startswith(("-e", "--editable")):
+                options.append(line)
+            else:
+                requirements.append(line)
+
+    visit(python_requirements_file)
+    return requirements, options
+
+
+def requirement_names(python_requirements_file: str) -> set[str]:
+    """Canonical names of all distributions a requirements file names, including its -r includes."""
+    names: set[str] = set()
+    for line in read_requirements(python_requirements_file)[0]:
+        try:
+            names.add(canonicalize_name(Requirement(line.split(" --hash", 1)[0].strip()).name))
+        except InvalidRequirement:
+            continue
+    return names
+
+
+def _pinned(requirements: list[str]) -> tuple[list[str], set[str]]:
+    """Names of the requirements and the canonical names of those with an exact version or url pin."""
+    names: list[str] = []
+    pinned: set[str] = set()
+    for line in requirements:
+        try:
+            requirement = Requirement(line.split(" --hash", 1)[0].strip())
+        except InvalidRequirement:
+            # editable installs and local paths are built from their source, there is no version to pin
+            continue
+        names.append(requirement.name)
+        if requirement.url is not None or any(s.operator == "===" or s.operator == "==" and not s.version.endswith("*") for s in requirement.specifier):
+            pinned.add(canonicalize_name(requirement.name))
+    return names, pinned
+
+
+def unpinned_requirements(python_requirements_file: str, additional_requirements: Iterable[str] = ()) -> list[str]:
+    """Names of the requirements and additional requirements without an exact version pin
+    in the requirements file or one of its constraint files."""
+    requirements, options = read_requirements(python_requirements_file) if python_requirements_file != "" else ([], [])
+    names, pinned = _pinned(requirements)
+    for option in options:
+        if option.startswith("--constraint "):
+            pinned |= _pinned(read_requirements(option.removeprefix("--constraint ").strip('"'))[0])[1]
+    return [n for n in dict.fromkeys([*names, *additional_requirements]) if canonicalize_name(n) not in pinned]
+
+
+def _installed_distributions(search_path: Optional[list[str]]) -> dict[str, Distribution]:
+    installed: dict[str, Distribution] = {}
+    for distribution in distributions(path=search_path) if search_path is not None else distributions():
+        if (name := distribution.metadata["Name"]) is None:
+            continue
+        installed.setdefault(canonicalize_name(name), distribution)
+    return installed
+
+
+def _is_satisfied(requirement: Requirement, installed: dict[str, Distribution], visited: set[tuple[str, str]]) -> bool:
+    if (distribution := installed.get(canonicalize_name(requirement.name))) is None:
+        return False
+    try:
+        if not requirement.specifier.contains(Version(distribution.version), prereleases=True):
+            return False
+    except InvalidVersion:
+        return False
+
+    for extra in requirement.extras:
+        if (requirement.name, extra) in visited:
+            continue
+        visited.add((requirement.name, extra))
+        environment = default_environment()
+        environment["extra"] = extra
+        for dependency in distribution.requires or []:
+            dependency_requirement = Requirement(dependency)
+            if dependency_requirement.marker is None or not dependency_requirement.marker.evaluate(environment):
+                continue
+            if not _is_satisfied(dependency_requirement, installed, visited):
+                return False
+    return True
+
+
+def find_missing_requirements(requirements: Iterable[str], search_path: Optional[list[str]] = None) -> list[str]:
+    """Return the requirement lines that are not satisfied by the distributions found on search_path (default: sys.path)."""
+    installed = _installed_distributions(search_path)
+    missing: list[str] = []
+    for line in requirements:
+        try:
+            requirement = Requirement(line.split(" --hash", 1)[0].strip())
+        except InvalidRequirement:
+            missing.append(line)
+            continue
+        if requirement.url is not None:
+            missing.append(line)
+            continue
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            continue
+        if not _is_satisfied(requirement, installed, set()):
+            missing.append(line)
+    return missing
+
+
+def diff_requirements():
+    ENVStorage.load()
+
+    requirements: list[str] = []
+    options: list[str] = []
+    if (python_requirements_file := ENVStorage.PYTHON_REQUIREMENTS_FILE_PATH) != "":
+        requirements, options = read_requirements(python_requirements_file)
+    requirements.extend(r.strip() for r in ENVStorage.ADDITIONAL_REQUIREMENTS.split("\n") if r.strip() != "")
+
+    missing = find_missing_requirements(requirements)
+
+    logger.debug("Requirements already satisfied: %s of %s", len(requirements) - len(missing), len(requirements))
+    logger.debug("Missing requirements: %s", missing)
+
+    missing_requirements_file = path.abspath(ENVStorage.MISSING_REQUIREMENTS_FILE_PATH)
+    with open(missing_requirements_file, "w", encoding="utf-8") as f:
+        f.write("".join(f"{line}\n" for line in options + missing))
+
+    OutputStorage.missing_requirements_file_path = missing_requirements_file
+    OutputStorage.missing_requirements_count = len(missing)
+
+
+if __name__ == "__main__":
+    try:
+        use_std_config()
+        logger = Logger("")
+        with batch_writes():
+            diff_requirements()
+    except BaseException as e:
+        exc = format_exc()
+        exc_type, exc_obj, exc_tb = exc_info()
+        ln = exc_tb.tb_lineno if exc_tb is not None else -1
+        fname = path.split(exc_tb.tb_frame.f_code.co_filename)[1] if exc_tb is not None else ""
+        # gets primted differently therefore not per logger
+        flush_github_streams()
+        print_to_err(f"::error title={type(e).__name__}::{type(e).__name__}: {str(e)}\n{exc}")
+        exit(1)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+import ast
+from os import path
+from typing import Any, NamedTuple
+
+
+TARGET_ENV = "PYINSTALLER_ACTION_TARGET"
+PHASE_ENV = "PYINSTALLER_ACTION_PHASE"
+
+
+class Target(NamedTuple):
+    script: str
+    name: str
+    icon: str
+
+
+class SpecError(Exception):
+    def __init__(self, msg: str = 'invalid spec file', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
+MAKESPEC_OPTIONS: dict[str, str | None] = {
+    # pyinstaller options that only apply when it generates the spec itself -> action input replacing them, None if there is none
+    "-D": "onefile", "--onedir": "onefile", "-F": "onefile", "--onefile": "onefile",
+    "--specpath": None, "-n": "output-name", "--name": "output-name", "--contents-directory": None,
+    "--add-data": "additional-data", "--add-binary": None, "-p": "paths", "--paths": "paths",
+    "--hidden-import": "hidden-imports", "--hiddenimport": "hidden-imports",
+    "--collect-submodules": None, "--collect-data": None, "--collect-datas": None, "--collect-binaries": None, "--collect-all": None,
+    "--copy-metadata": None, "--recursive-copy-metadata": None, "--additional-hooks-dir": None, "--runtime-hook": None,
+    "--exclude-module": "exclude-modules", "--key": None, "--splash": None,
+    "-d": None, "--debug": None, "--optimize": "optimize", "--python-option": None,
+    "-s": "strip", "--strip": "strip", "--noupx": "upx", "--upx-exclude": "upx-exclude",
+    "-c": "no-console", "--console": "no-console", "--nowindowed": "no-console",
+    "-w": "no-console", "--windowed": "no-console", "--noconsole": "no-console", "--hide-console": None,
+    "-i": "icon-path", "--icon": "icon-path", "--disable-windowed-traceback": None,
+    "--version-file": None, "--manifest": None, "-m": None, "--no-embed-manifest": None, "-r": None, "--resource": None,
+    "--uac-admin": None, "--uac-uiaccess": None, "--win-private-assemblies": None, "--win-no-prefer-redirects": None,
+    "--argv-emulation": None, "--osx-bundle-identifier": None, "--target-architecture": None, "--target-arch": None,
+    "--codesign-identity": None, "--osx-entitlements-file": None, "--runtime-tmpdir": None, "--bootloader-ignore-signals": None,
+}
+
+
+def _option(argument: str) -> str:
+    return argument.partition("=")[0] if argument.startswith("--") else argument[:2]
+
+
+def makespec_options(arguments: list[str]) -> list[tuple[str, str]]:
+    """(argument, option) of the arguments pyinstaller rejects when it builds from a spec file."""
+    return [(a, _option(a)) for a in arguments if _option(a) in MAKESPEC_OPTIONS]
+
+
+SPEC_TEMPLATE = '''# -*- mode: python ; coding: utf-8 -*-
+# generated by pyinstaller_action from the action inputs, identical inputs give an identical file
+import os
+
+TARGETS = {targets}
+DISTPATH = {distpath}
+ONEFILE = {onefile}
+CONSOLE = {console}
+PATHEX = {pathex}
+DATAS = {datas}
+HIDDEN_IMPORTS = {hidden_imports}
+EXCLUDES = {excludes}
+OPTIMIZE = {optimize}
+STRIP = {strip}
+UPX = {upx}
+UPX_EXCLUDE = {upx_exclude}
+COMPRESSION_LEVEL = {compression_level}
+
+if COMPRESSION_LEVEL is not None:
+    # zlib level of the onefile archive, pyinstaller has no option for it
+    from PyInstaller.archive.writers import CArchiveWriter
+    if not hasattr(CArchiveWriter, "_COMPRESSION_LEVEL"):
+        raise SystemExit("onefile-compression-level is not supported by this pyinstaller version, CArchiveWriter has no _COMPRESSION_LEVEL")
+    CArchiveWriter._COMPRESSION_LEVEL = COMPRESSION_LEVEL
+
+# Analysis only knows optimize since pyinstaller 6.6, leave it out by default so older versions keep working
+_analysis_options = {{"optimize": OPTIMIZE}} if OPTIMIZE != 0 else {{}}
+
+# {target_env} selects a single target, so targets can be bundled by parallel pyinstaller processes.
+# {phase_env}=analyze only runs the analyses: the analyses of one process share pyinstaller's module graph, and
+# every analysis keeps the number of its target so the bundling processes reuse its result instead of analyzing again
+_selected = os.environ.get("{target_env}", "")
+if _selected != "" and _selected not in TARGETS:
+    raise SystemExit(f"unknown target {{_selected}}, the spec defines {{', '.join(TARGETS)}}")
+_analyze_only = os.environ.get("{phase_env}", "") == "analyze"
+
+for _index, _name in enumerate(TARGETS):
+    if _selected != "" and _name != _selected:
+        continue
+    _target = TARGETS[_name]
+    _icon = [_target["icon"]] if _target["icon"] != "" else None
+    Analysis.invcnum = _index
+    a = Analysis([_target["script"]], pathex=PATHEX, datas=DATAS, hiddenimports=HIDDEN_IMPORTS, excludes=EXCLUDES, **_analysis_options)
+    if _analyze_only:
+        continue
+    pyz = PYZ(a.pure)
+    if ONEFILE:
+        exe = EXE(pyz, a.scripts, a.binaries, a.datas, [], name=_name, console=CONSOLE, icon=_icon,
+                  strip=STRIP, upx=UPX, upx_exclude=UPX_EXCLUDE)
+    else:
+        exe = EXE(pyz, a.scripts, [], exclude_binaries=True, name=_name, console=CONSOLE, icon=_icon,
+                  strip=STRIP, upx=UPX, upx_exclude=UPX_EXCLUDE)
+        coll = COLLECT(exe, a.binaries, a.datas, name=_name, strip=STRIP, upx=UPX, upx_exclude=UPX_EXCLUDE)
+'''
+
+
+def _literal(value: Any, indent: str = "") -> str:
+    """Python literal with one entry per line, dicts sorted by key."""
+    if isinstance(value, dict):
+        if len(value) == 0:
+            return "{}"
+        return "{\n" + "".join(f"{indent}    {k!r}: {_literal(v, indent + '    ')},\n" for k, v in sorted(value.items())) + indent + "}"
+    if isinstance(value, list):
+        if len(value) == 0:
+            return "[]"
+        return "[\n" + "".join(f"{indent}    {_literal(v, indent + '    ')},\n" for v in value) + indent + "]"
+    return repr(value)
+
+
+def render_spec(targets: list[Target], values: dict[str, Any]) -> str:
+    """Render the spec of all targets. Entries whose order does not matter are sorted and paths normalized,
+    the paths keep their order as it decides which module shadows which."""
+    return SPEC_TEMPLATE.format(
+        targets=_literal({t.name: {"script": path.normpath(t.script), "icon": path.normpath(t.icon) if t.icon != "" else ""} for t in targets}),
+        distpath=_literal(path.normpath(values["output-path"])),
+        onefile=_literal(values["onefile"]),
+        console=_literal(not values["no-console"]),
+        pathex=_literal([path.normpath(p) for p in values["paths"]]),
+        datas=_literal(sorted({(path.normpath(source), path.normpath(target)) for source, target in values["additional-data"]})),
+        hidden_imports=_literal(sorted(set(values["hidden-imports"]))),
+        excludes=_literal(sorted(set(values["exclude-modules"]))),
+        optimize=_literal(int(values["optimize"])),
+        strip=_literal(values["strip"]),
+        upx=_literal(values["upx"]),
+        upx_exclude=_literal(sorted(set(values["upx-exclude"]))),
+        compression_level=_literal(int(values["onefile-compression-level"]) if values["onefile-compression-level"] != "" else None),
+        target_env=TARGET_ENV,
+        phase_env=PHASE_ENV,
+    )
+
+
+def read_spec_constants(spec: str, names: tuple[str, ...]) -> dict[str, Any]:
+    """Read the literal module level assignments names of a generated spec without executing it."""
+    constants: dict[str, Any] = {}
+    for node in ast.parse(spec).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) and node.targets[0].id in names:
+            constants[node.targets[0].id] = ast.literal_eval(node.value)
+    if len(t_missing := [n for n in names if n not in constants]) > 0:
+        raise SpecError(f"spec does not define {', '.join(t_missing)}!")
+    return constants
@@ -0,0 +1,140 @@
+from __future__ import annotations
+from json import dump, load
+from os import environ, path, replace
+from sys import argv, exc_info, stderr
+from time import monotonic
+from traceback import format_exc
+from typing import Any, Iterable
+
+from lib.logger_gh_actions import flush_github_streams, use_std_config
+from lib.logger import Logger, Span
+
+
+def print_to_err(x: str) -> None:
+    return print(x, file=stderr)
+
+
+logger: Logger
+
+TIMING_FILE_VERSION = 1
+
+USAGE = """usage: timing.py begin <name> | end <name> | summary
+the timing file is read from TIMING_FILE_PATH, summary appends a markdown table to GITHUB_STEP_SUMMARY"""
+
+
+class TimingError(Exception):
+    def __init__(self, msg: str = 'invalid timing file operation', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
+def load_timing_file(timing_file: str) -> list[dict[str, Any]]:
+    if not path.isfile(timing_file):
+        return []
+    with open(timing_file, "r", encoding="utf-8") as f:
+        content = load(f)
+    if content.get("version") != TIMING_FILE_VERSION:
+        raise TimingError(f"unsupported timing file version {content.get('version')} in {timing_file}!")
+    return content["spans"]
+
+
+def save_timing_file(timing_file: str, records: list[dict[str, Any]]) -> None:
+    with open(t_tmp := f"{timing_file}.tmp", "w", encoding="utf-8") as f:
+        dump({"version": TIMING_FILE_VERSION, "clock": "monotonic", "spans": records}, f, indent=2)
+    replace(t_tmp, timing_file)
+
+
+def _open_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [r for r in records if r["end"] is None]
+
+
+def span_records(spans: Iterable[Span], source: str, depth_offset: int = 0) -> list[dict[str, Any]]:
+    return [{"name": s.name, "source": source, "depth": s.depth + depth_offset,
+             "parent": s.parent.name if s.parent is not None else None,
+             "start": s.start, "end": s.end, "duration": s.duration} for s in spans]
+
+
+def append_spans(timing_file: str, spans: Iterable[Span], source: str, *, clear: bool = False) -> str:
+    """Add spans to the timing file, nested below the spans that are still open in it. Returns the absolute file path."""
+    timing_file = path.abspath(timing_file)
+    records = [] if clear else load_timing_file(timing_file)
+    t_open = _open_records(records)
+    t_new = span_records(spans, source, len(t_open))
+    for r in t_new:
+        if r["parent"] is None and len(t_open) > 0:
+            r["parent"] = t_open[-1]["name"]
+    save_timing_file(timing_file, records + t_new)
+    return timing_file
+
+
+def begin_span(timing_file: str, name: str, source: str = "action") -> None:
+    records = load_timing_file(timing_file)
+    t_open = _open_records(records)
+    records.append({"name": name, "source": source, "depth": len(t_open),
+                    "parent": t_open[-1]["name"] if len(t_open) > 0 else None,
+                    "start": monotonic(), "end": None, "duration": None})
+    save_timing_file(timing_file, records)
+
+
+def end_span(timing_file: str, name: str) -> float:
+    records = load_timing_file(timing_file)
+    for r in reversed(_open_records(records)):
+        if r["name"] == name:
+            r["end"] = monotonic()
+            r["duration"] = r["end"] - r["start"]
+            save_timing_file(timing_file, records)
+            return r["duration"]
+    raise TimingError(f"span {name} was not started in {timing_file}!")
+
+
+def timing_markdown(records: list[dict[str, Any]]) -> str:
+    if len(records) == 0:
+        return ""
+    t_origin = min(r["start"] for r in records)
+    lines = ["| Span | Start (s) | Duration (s) |", "| --- | ---: | ---: |"]
+    for r in records:
+        t_name = "&nbsp;&nbsp;&nbsp;&nbsp;" * r["depth"] + r["name"].replace("|", "\\|")
+        t_duration = f"{r['duration']:.3f}" if r["duration"] is not None else "unfinished"
+        lines.append(f"| {t_name} | {r['start'] - t_origin:.3f} | {t_duration} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_step_summary(timing_file: str, step_summary_file: str) -> None:
+    if (markdown := timing_markdown(load_timing_file(timing_file))) == "":
+        logger.debug("No spans in %s", timing_file)
+        return
+    with open(step_summary_file, "a", encoding="utf-8") as f:
+        f.write(f"### pyinstaller action timing\n\n{markdown}\n")
+
+
+def run_command(args: list[str]) -> None:
+    if (timing_file := environ.get("TIMING_FILE_PATH", "")) == "":
+        logger.warning("TIMING_FILE_PATH is not set, no timing recorded")
+        return
+
+    if len(args) == 2 and args[0] == "begin":
+        begin_span(timing_file, args[1])
+    elif len(args) == 2 and args[0] == "end":
+        logger.debug("Span %s took %.3f s", args[1], end_span(timing_file, args[1]))
+    elif len(args) == 1 and args[0] == "summary":
+        if (step_summary_file := environ.get("GITHUB_STEP_SUMMARY", "")) == "":
+            logger.warning("GITHUB_STEP_SUMMARY is not set, no summary written")
+            return
+        write_step_summary(timing_file, step_summary_file)
+    else:
+        raise TimingError(USAGE)
+
+
+if __name__ == "__main__":
+    try:
+        use_std_config()
+        logger = Logger("")
+        run_command(argv[1:])
+    except BaseException as e:
+        exc = format_exc()
+        exc_type, exc_obj, exc_tb = exc_info()
+        ln = exc_tb.tb_lineno if exc_tb is not None else -1
+        fname = path.split(exc_tb.tb_frame.f_code.co_filename)[1] if exc_tb is not None else ""
+        # gets primted differently therefore not per logger
+        flush_github_streams()
+        print_to_err(f"::error title={type(e).__name__}::{type(e).__name__}: {str(e)}\n{exc}")
+        exit(1)
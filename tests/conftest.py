@@ -0,0 +1,4 @@
+from os import path
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,117 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import build
+from build import BuildError
+from data_staging import data_files, plan_staging, write_staging_plan
+from lib.logger import Logger
+from spec_file import Target, render_spec
+
+
+# the build only logs, the tests check the pyinstaller output
+pytestmark = pytest.mark.filterwarnings("ignore:Logger hat keine Handler")
+
+FAKE_PYINSTALLER = """
+import os, sys
+args = sys.argv[1:]
+work = os.path.join(args[args.index("--workpath") + 1], os.path.splitext(os.path.basename(args[-1]))[0])
+os.makedirs(work, exist_ok=True)
+
+class Target:
+    invcnum = 0
+    def __init__(self, *args, **kwargs):
+        self.invcnum = type(self).invcnum
+        type(self).invcnum += 1
+        self.pure = self.scripts = self.binaries = self.datas = []
+        toc = os.path.join(work, "%s-%02d.toc" % (type(self).__name__, self.invcnum))
+        print("reuse" if os.path.exists(toc) else "build", os.path.basename(toc))
+        with open(toc, "a") as f:
+            f.write("x")
+
+print("env", os.environ.get("SOURCE_DATE_EPOCH"), os.environ.get("PYTHONHASHSEED"))
+names = {name: type(name, (Target,), {}) for name in ("Analysis", "PYZ", "EXE", "COLLECT")}
+exec(open(args[-1]).read(), names)
+if os.environ.get("PYINSTALLER_ACTION_TARGET", "") == os.environ.get("FAKE_PYINSTALLER_FAIL"):
+    sys.exit(3)
+"""
+
+
+@pytest.fixture
+def env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "fake" / "PyInstaller").mkdir(parents=True)
+    (tmp_path / "fake" / "PyInstaller" / "__init__.py").write_text("", encoding="utf-8")
+    (tmp_path / "fake" / "PyInstaller" / "__main__.py").write_text(FAKE_PYINSTALLER, encoding="utf-8")
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path / "fake"))
+    monkeypatch.setattr(build, "logger", Logger(""), raising=False)
+    for name, value in {"SPEC_FILE_PATH": str(tmp_path / "action.spec"), "BUILD_PATH": str(tmp_path / "build"), "CACHE_KEY": "key",
+                        "ADDITIONAL_ARGUMENTS": "", "TIMING_FILE_PATH": "", "BUILD_SOURCE_DATE_EPOCH": "", "BUILD_PYTHONHASHSEED": "",
+                        "EXCLUDE_CANDIDATES": "", "DATA_STAGING_PLAN_FILE_PATH": "", "GITHUB_OUTPUT": str(tmp_path / "output.txt"), "FAKE_PYINSTALLER_FAIL": "-"}.items():
+        monkeypatch.setenv(name, value)
+    return tmp_path
+
+
+def _write_spec(tmp_path: Path, names: list[str]) -> None:
+    values: dict[str, Any] = {"output-path": str(tmp_path / "dist"), "onefile": True, "no-console": False, "paths": [], "additional-data": [],
+                              "hidden-imports": [], "exclude-modules": [], "optimize": "0", "strip": False, "upx": False, "upx-exclude": [],
+                              "onefile-compression-level": ""}
+    (tmp_path / "action.spec").write_text(render_spec([Target(f"{n}.py", n, "") for n in names], values), encoding="utf-8")
+
+
+def test_targets_share_one_analysis(env: Path, capsys: pytest.CaptureFixture[str]):
+    _write_spec(env, ["a", "b"])
+    build.build()
+    output = capsys.readouterr().out
+
+    # the analyze run analyzes both targets, the bundling runs reuse its results
+    assert output.count("build Analysis-00.toc") == 1 and output.count("build Analysis-01.toc") == 1
+    assert "reuse Analysis-00.toc" in output and "reuse Analysis-01.toc" in output
+    assert output.count("build EXE-00.toc") == 2
+    assert sorted(p.name for p in (env / "build" / "pyinstaller_install_dir").iterdir()) == ["a", "b"]
+    assert (env / "build" / "pyinstaller_cache_dir").is_dir()
+    assert not (env / "build" / "pyinstaller_worker_cache_dir").exists()
+
+
+def test_single_target_builds_in_one_run(env: Path, capsys: pytest.CaptureFixture[str]):
+    _write_spec(env, ["a"])
+    build.build()
+    output = capsys.readouterr().out
+
+    assert output.count("Analysis-00.toc") == 1
+    assert not (env / "build" / "pyinstaller_analysis_dir").exists()
+    assert "env None None" in output
+
+
+def test_reproducible_env(env: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]):
+    _write_spec(env, ["a", "b"])
+    monkeypatch.setenv("BUILD_SOURCE_DATE_EPOCH", "315532800")
+    monkeypatch.setenv("BUILD_PYTHONHASHSEED", "0")
+    build.build()
+    # the analysis and both bundling runs
+    assert capsys.readouterr().out.count("env 315532800 0") == 3
+
+
+def test_failing_target(env: Path, monkeypatch: pytest.MonkeyPatch):
+    _write_spec(env, ["a", "b"])
+    monkeypatch.setenv("FAKE_PYINSTALLER_FAIL", "b")
+    with pytest.raises(BuildError, match="pyinstaller failed for b"):
+        build.build()
+
+
+def test_suggests_installed_exclude_candidates(env: Path, monkeypatch: pytest.MonkeyPatch):
+    _write_spec(env, ["a"])
+    monkeypatch.setenv("EXCLUDE_CANDIDATES", "json\nnot_installed_module")
+    build.build()
+    assert (env / "output.txt").read_text(encoding="utf-8") == "suggested_exclude_modules<<EOF\njson\nEOF\n"
+
+
+def test_stages_planned_data(env: Path, monkeypatch: pytest.MonkeyPatch):
+    _write_spec(env, ["a"])
+    (env / "data").mkdir()
+    (env / "data" / "x.txt").write_text("x", encoding="utf-8")
+    plan = plan_staging(data_files([(str(env / "data"), "assets")]))
+    monkeypatch.setenv("DATA_STAGING_PLAN_FILE_PATH", write_staging_plan(str(env / "plan.json"), str(env / "staging"), plan))
+    build.build()
+    assert (env / "staging" / "assets" / "x.txt").read_text(encoding="utf-8") == "x"
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from os import stat
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import data_staging
+from data_staging import DataFile, StagedFile, data_files, plan_staging, read_staging_plan, stage_data, write_staging_plan
+from file_hash import hash_files
+from input_schema import InputError
+
+
+@pytest.fixture
+def sources(tmp_path: Path) -> Path:
+    sources = tmp_path / "sources"
+    for name, content in {"a.txt": "same", "sub/b.txt": "same", "c.txt": "diff", "d.txt": "other content"}.items():
+        (sources / name).parent.mkdir(parents=True, exist_ok=True)
+        (sources / name).write_text(content, encoding="utf-8")
+    return sources
+
+
+def _plan(additional_data: list[tuple[str, str]], hashes: dict[str, str] | None = None) -> list[StagedFile]:
+    return plan_staging(data_files(additional_data), hashes)
+
+
+def test_stage_data_links_and_deduplicates(tmp_path: Path, sources: Path):
+    staging = tmp_path / "staging"
+    files = data_files([(str(sources), "data"), (str(sources / "d.txt"), "."), (str(sources / "d.txt"), "copy")])
+    assert files == [
+        DataFile(str(sources / "a.txt"), "data/a.txt"),
+        DataFile(str(sources / "c.txt"), "data/c.txt"),
+        DataFile(str(sources / "d.txt"), "data/d.txt"),
+        DataFile(str(sources / "sub" / "b.txt"), "data/sub/b.txt"),
+        DataFile(str(sources / "d.txt"), "d.txt"),
+        DataFile(str(sources / "d.txt"), "copy/d.txt"),
+    ]
+    result = stage_data(plan_staging(files), str(staging))
+
+    # sub/b.txt has the content of a.txt, d.txt is bundled three times
+    assert (result.linked, result.copied, result.deduplicated) == (3, 0, 3)
+    assert sorted(p.relative_to(staging).as_posix() for p in staging.rglob("*") if p.is_file()) == [
+        "copy/d.txt", "d.txt", "data/a.txt", "data/c.txt", "data/d.txt", "data/sub/b.txt"]
+    assert stat(staging / "data" / "sub" / "b.txt").st_ino == stat(sources / "a.txt").st_ino
+    assert stat(staging / "copy" / "d.txt").st_ino == stat(sources / "d.txt").st_ino
+
+
+def test_stage_data_copies_without_hardlinks(tmp_path: Path, sources: Path, monkeypatch: pytest.MonkeyPatch):
+    def link(source: str, target: str) -> None:
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(data_staging, "link", link)
+    staging = tmp_path / "staging"
+    result = stage_data(_plan([(str(sources), ".")]), str(staging))
+
+    assert (result.linked, result.copied, result.deduplicated) == (0, 3, 1)
+    assert (staging / "sub" / "b.txt").read_text(encoding="utf-8") == "same"
+    assert stat(staging / "a.txt").st_ino != stat(sources / "a.txt").st_ino
+
+
+def test_plan_staging_rejects_conflicts(tmp_path: Path, sources: Path):
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "c.txt").write_text("same", encoding="utf-8")
+    with pytest.raises(InputError, match="are both bundled as x/c.txt"):
+        _plan([(str(sources / "c.txt"), "x"), (str(tmp_path / "other" / "c.txt"), "x")])
+
+    # the same file twice and equal content under the same name are no conflict
+    (tmp_path / "other" / "c.txt").write_text("diff", encoding="utf-8")
+    result = stage_data(_plan([(str(sources / "c.txt"), "x"), (str(sources), "x"), (str(tmp_path / "other" / "c.txt"), "x")]), str(tmp_path / "staging"))
+    assert (tmp_path / "staging" / "x" / "c.txt").read_text(encoding="utf-8") == "diff"
+    assert result.deduplicated == 1
+
+    with pytest.raises(InputError, match="outside of the bundle"):
+        _plan([(str(sources / "c.txt"), "..")])
+
+
+def test_plan_staging_reuses_hashes(tmp_path: Path, sources: Path, monkeypatch: pytest.MonkeyPatch):
+    files = data_files([(str(sources), ".")])
+    hashes = hash_files([f.source for f in files])
+
+    def hash_again(*args: Any) -> None:
+        raise AssertionError("the manifest hashes cover every source")
+
+    monkeypatch.setattr(data_staging, "hash_files", hash_again)
+    plan = plan_staging(files, hashes)
+    assert [f.key for f in plan] == [f"sha256:{hashes[f.source]}" for f in files]
+
+    # the build step stages from the plan file alone
+    plan_file = write_staging_plan(str(tmp_path / "plan.json"), str(tmp_path / "staging"), plan)
+    assert read_staging_plan(plan_file) == (str(tmp_path / "staging"), plan)
+    assert stage_data(plan, str(tmp_path / "staging")).deduplicated == 1
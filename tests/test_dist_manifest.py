@@ -0,0 +1,54 @@
+from __future__ import annotations
+from hashlib import sha256
+from os import stat
+from pathlib import Path
+
+import pytest
+
+import dist_manifest
+from dist_manifest import DistError, create_dist_manifest, dist_files, write_dist_manifest
+from lib.logger import Logger
+
+
+pytestmark = pytest.mark.filterwarnings("ignore:Logger hat keine Handler")
+
+
+@pytest.fixture
+def dist(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    for name, content in {"app/app.exe": "exe", "app/_internal/b.dll": "dll", "app/_internal/a-b.pyd": "pyd"}.items():
+        (tmp_path / "dist" / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "dist" / name).write_text(content, encoding="utf-8")
+    monkeypatch.setattr(dist_manifest, "logger", Logger(""), raising=False)
+    for name, value in {"DIST_PATH": str(tmp_path / "dist"), "DIST_MANIFEST_FILE_PATH": str(tmp_path / "dist.sha256"), "REPRODUCIBLE": "false",
+                        "BUILD_SOURCE_DATE_EPOCH": "", "GITHUB_OUTPUT": str(tmp_path / "output.txt")}.items():
+        monkeypatch.setenv(name, value)
+    return tmp_path / "dist"
+
+
+def test_manifest_format(dist: Path, tmp_path: Path):
+    files = dist_files(str(dist))
+    # ordered by the / separated relative path on every platform
+    assert [Path(f).relative_to(dist).as_posix() for f in files] == ["app/_internal/a-b.pyd", "app/_internal/b.dll", "app/app.exe"]
+
+    digest = write_dist_manifest(str(dist), files, str(tmp_path / "dist.sha256"))
+    manifest = (tmp_path / "dist.sha256").read_bytes()
+    assert manifest.decode().splitlines()[2] == f"{sha256(b'exe').hexdigest()}  app/app.exe"
+    assert digest == sha256(manifest).hexdigest()
+
+
+def test_reproducible_mtimes(dist: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("REPRODUCIBLE", "true")
+    monkeypatch.setenv("BUILD_SOURCE_DATE_EPOCH", "315532800")
+    create_dist_manifest()
+    assert {stat(p).st_mtime for p in [dist, *dist.rglob("*")]} == {315532800}
+    assert "dist_file_count<<EOF\n3\nEOF\n" in (tmp_path / "output.txt").read_text(encoding="utf-8")
+
+    monkeypatch.setenv("BUILD_SOURCE_DATE_EPOCH", "")
+    with pytest.raises(DistError, match="unix timestamp"):
+        create_dist_manifest()
+
+
+def test_empty_dist(dist: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("DIST_PATH", str(dist / "missing"))
+    with pytest.raises(DistError, match="contains no files"):
+        create_dist_manifest()
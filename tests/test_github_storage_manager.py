@@ -0,0 +1,72 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from lib.github_storage_manager import GithubENVManager, GithubOutputManager, MissingENVVariables, batch_writes
+
+
+class _ENV(GithubENVManager):
+    NAME: str
+    FLAG: bool
+
+
+class _Output(GithubOutputManager):
+    name: str
+    flag: bool
+
+
+@pytest.fixture
+def files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("GITHUB_ENV", str(tmp_path / "env.txt"))
+    monkeypatch.setenv("GITHUB_OUTPUT", str(tmp_path / "output.txt"))
+    monkeypatch.setenv("NAME", "")
+    monkeypatch.setenv("FLAG", "false")
+    return tmp_path
+
+
+def test_batch_writes_commit_once(files: Path):
+    with batch_writes():
+        _ENV.NAME = "a"
+        _Output.name = "b"
+        with batch_writes():
+            _Output.flag = True
+        # nothing is written before the outermost batch ends
+        assert not (files / "env.txt").exists() and not (files / "output.txt").exists()
+    assert (files / "env.txt").read_text() == "NAME<<EOF\na\nEOF\n"
+    assert (files / "output.txt").read_text() == "name<<EOF\nb\nEOF\nflag<<EOF\ntrue\nEOF\n"
+
+
+def test_batch_writes_discarded_on_error(files: Path):
+    with pytest.raises(RuntimeError):
+        with batch_writes():
+            _Output.name = "b"
+            raise RuntimeError()
+    assert not (files / "output.txt").exists()
+    _Output.name = "c"
+    assert (files / "output.txt").read_text() == "name<<EOF\nc\nEOF\n"
+
+
+def test_env_values_are_converted_once(files: Path, monkeypatch: pytest.MonkeyPatch):
+    _ENV.load()
+    assert _ENV.NAME == "" and _ENV.FLAG is False
+    # load snapshots the environment, later changes are not read again
+    monkeypatch.setenv("FLAG", "true")
+    assert _ENV.FLAG is False
+    # setting a variable updates the snapshot and the environment for child processes
+    _ENV.FLAG = True
+    assert _ENV.FLAG is True and (files / "env.txt").read_text() == "FLAG<<EOF\ntrue\nEOF\n"
+
+
+def test_env_reports_every_missing_variable(files: Path, monkeypatch: pytest.MonkeyPatch):
+    class _Later(GithubENVManager):
+        COUNT: int
+        OTHER: str
+
+    monkeypatch.delenv("OTHER", raising=False)
+    monkeypatch.delenv("COUNT", raising=False)
+    with pytest.raises(MissingENVVariables, match="COUNT, OTHER"):
+        _Later.load()
+    # single variables are still read on first access
+    monkeypatch.setenv("COUNT", "3")
+    assert _Later.COUNT == 3
@@ -0,0 +1,62 @@
+from __future__ import annotations
+import ast
+from pathlib import Path
+
+from import_graph import ImportRef, analyze_imports, find_imports, installed_modules, suggest_exclude_modules, suggest_hidden_imports
+
+
+def _write(root: Path, files: dict[str, str]) -> None:
+    for name, source in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(source, encoding="utf-8")
+
+
+def test_find_imports():
+    tree = ast.parse("import a.b, c\nfrom .d import e\nfrom f import *\nimport importlib\n"
+                     "importlib.import_module('g')\nimport_module('.h', 'pkg.sub')\n__import__(name)\n")
+    assert find_imports(tree) == [
+        ImportRef("a.b", 0, (), 1),
+        ImportRef("c", 0, (), 1),
+        ImportRef("d", 1, ("e",), 2),
+        ImportRef("f", 0, (), 3),
+        ImportRef("importlib", 0, (), 4),
+        ImportRef("g", 0, (), 5, True),
+        ImportRef("pkg.sub.h", 0, (), 6, True),
+        ImportRef("", 0, (), 7, True),
+    ]
+
+
+def test_analyze_imports_follows_local_modules(tmp_path: Path):
+    _write(tmp_path, {
+        "main.py": "import helper\nfrom pkg import plugin\nimport json\n",
+        "helper.py": "from importlib import import_module\nimport_module('pkg.dynamic')\nimport_module(name)\n",
+        "pkg/__init__.py": "",
+        "pkg/plugin.py": "from . import helper2\n",
+        "pkg/helper2.py": "import broken\n",
+        "pkg/dynamic.py": "",
+        "broken.py": "def (:\n",
+        "unused.py": "",
+    })
+    analysis = analyze_imports([str(tmp_path / "main.py")], [str(tmp_path)])
+
+    assert sorted(Path(m.file).relative_to(tmp_path).as_posix() for m in analysis.modules) == [
+        "broken.py", "helper.py", "main.py", "pkg/__init__.py", "pkg/dynamic.py", "pkg/helper2.py", "pkg/plugin.py"]
+    assert [Path(m.file).name for m in analysis.unparsable] == ["broken.py"]
+    assert set(analysis.dynamic_imports) == {"pkg.dynamic"}
+    assert analysis.unresolved_dynamic_imports == [(str(tmp_path / "helper.py"), 3)]
+    assert {"json", "pkg.plugin", "pkg.helper2"} <= set(analysis.static_imports)
+    assert suggest_hidden_imports(analysis, [], []) == ["pkg.dynamic"]
+    assert suggest_hidden_imports(analysis, ["pkg.dynamic"], []) == []
+
+
+def test_suggest_exclude_modules(tmp_path: Path):
+    _write(tmp_path, {"main.py": "import tkinter\nimport matplotlib.pyplot\n"})
+    analysis = analyze_imports([str(tmp_path / "main.py")], [str(tmp_path)])
+
+    suggested = suggest_exclude_modules(analysis, ["IPython.display"], ["PyQt5"], ["jedi"])
+    assert not {"tkinter", "matplotlib", "IPython", "PyQt5", "jedi"} & set(suggested)
+    assert "PySide6" in suggested
+
+
+def test_installed_modules():
+    assert installed_modules(["json", "not_installed_module", "json.missing_submodule", ""]) == ["json"]
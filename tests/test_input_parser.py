@@ -0,0 +1,32 @@
+from __future__ import annotations
+from typing import Any
+
+import pytest
+
+from input_parser import check_additional_arguments, check_build_profile
+from input_schema import InputError
+
+
+def _values(**values: Any) -> dict[str, Any]:
+    return {"onefile": True, "strip": False, "upx": False, "upx-exclude": [], "onefile-compression-level": "", **values}
+
+
+@pytest.mark.parametrize("values, additional_arguments, message", [
+    (_values(**{"upx-exclude": ["a.dll"]}), "", "upx-exclude needs upx"),
+    (_values(), "--upx-dir C:\\upx", "--upx-dir needs upx"),
+    (_values(), "--log-level=WARN --upx-dir=C:\\upx", "--upx-dir needs upx"),
+    (_values(onefile=False, **{"onefile-compression-level": "9"}), "", "only applies to onefile"),
+])
+def test_check_build_profile(values: dict[str, Any], additional_arguments: str, message: str):
+    with pytest.raises(InputError, match=message):
+        check_build_profile(values, additional_arguments)
+
+
+def test_check_build_profile_accepts_upx_dir():
+    check_build_profile(_values(upx=True), "--upx-dir C:\\upx")
+
+
+def test_check_additional_arguments():
+    check_additional_arguments("--clean --log-level WARN")
+    with pytest.raises(InputError, match="use the upx input instead"):
+        check_additional_arguments("--noupx")
@@ -0,0 +1,77 @@
+from __future__ import annotations
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from input_schema import INPUT_KIND, PATH_CHECK, InputError, InputSpec, format_input, parse_inputs
+
+
+SCHEMA = (
+    InputSpec("flag", "FLAG", None, INPUT_KIND.BOOL),
+    InputSpec("mode", "MODE", None, choices=("a", "b"), default=lambda values: "a"),
+    InputSpec("names", "NAMES", None, INPUT_KIND.LIST),
+    InputSpec("targets", "TARGETS", None, INPUT_KIND.TARGET_LIST, required=True, path_check=PATH_CHECK.FILE),
+    InputSpec("data", "DATA", "data", INPUT_KIND.DATA_LIST, path_check=PATH_CHECK.EXISTS),
+)
+
+
+def _parse(**env: str) -> dict[str, Any]:
+    return parse_inputs(SCHEMA, SimpleNamespace(**{"FLAG": "false", "MODE": "", "NAMES": "", "TARGETS": "", "DATA": "", **env}))
+
+
+@pytest.fixture
+def files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    for name in ("main.py", "tool.py", "app.ico", "data/a.txt", "data/b.txt", "lib [v2]/x.dat"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name, encoding="utf-8")
+    return tmp_path
+
+
+def test_parse_values(files: Path):
+    values = _parse(FLAG="true", NAMES="b\n a \n\nb\n", TARGETS="main.py\ntool.py;tool;app.ico\nmain.py")
+    assert values["flag"] is True
+    assert values["mode"] == "a"
+    assert values["names"] == ["b", "a"]
+    assert values["targets"] == [(str(files / "main.py"), "", ""), (str(files / "tool.py"), "tool", str(files / "app.ico"))]
+    assert values["data"] == []
+
+
+@pytest.mark.parametrize("env, message", [
+    ({"TARGETS": "main.py", "FLAG": "yes"}, "flag must be either true or false"),
+    ({"TARGETS": "main.py", "MODE": "c"}, "mode must be one of a, b"),
+    ({}, "targets is required"),
+    ({"TARGETS": "missing.py"}, "does not exist"),
+    ({"TARGETS": "main.py;a;b;c"}, "must have the form"),
+    ({"TARGETS": "main.py", "DATA": "data"}, "must have the form source;target"),
+    ({"TARGETS": "main.py", "DATA": "missing*.txt;x"}, "does not match anything"),
+])
+def test_invalid_inputs(files: Path, env: dict[str, str], message: str):
+    with pytest.raises(InputError, match=message):
+        _parse(**env)
+
+
+def test_data_globs_and_literal_paths(files: Path):
+    values = _parse(TARGETS="main.py", DATA="data/*.txt;d\nlib [v2]/x.dat;.\ndata;data")
+    assert values["data"] == [(str(files / "data" / "a.txt"), "d"), (str(files / "data" / "b.txt"), "d"),
+                              (str(files / "lib [v2]" / "x.dat"), "."), (str(files / "data"), "data")]
+    assert format_input(SCHEMA[4], values["data"][2:]) == f"{files / 'lib [v2]' / 'x.dat'};.\n{files / 'data'};data"
+
+
+def test_data_globs_keep_layout(files: Path):
+    for name in ("assets/a/x.txt", "assets/b/x.txt", "assets/b/c/y.bin", "assets/top.txt"):
+        (files / name).parent.mkdir(parents=True, exist_ok=True)
+        (files / name).write_text(name, encoding="utf-8")
+    assets = files / "assets"
+
+    assert _parse(TARGETS="main.py", DATA="assets/**/*.txt;assets")["data"] == [
+        (str(assets / "a" / "x.txt"), "assets/a"), (str(assets / "b" / "x.txt"), "assets/b"), (str(assets / "top.txt"), "assets")]
+    # the directories are matched by ** as well, but their files are already bundled one by one
+    assert _parse(TARGETS="main.py", DATA="assets/**;res")["data"] == [
+        (str(assets / "a" / "x.txt"), "res/a"), (str(assets / "b" / "c" / "y.bin"), "res/b/c"),
+        (str(assets / "b" / "x.txt"), "res/b"), (str(assets / "top.txt"), "res")]
+    # a matched directory without matched content is bundled as a whole below its own name
+    assert _parse(TARGETS="main.py", DATA="assets/*;.")["data"] == [
+        (str(assets / "a"), "a"), (str(assets / "b"), "b"), (str(assets / "top.txt"), ".")]
@@ -0,0 +1,225 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import gc
+import gzip
+from os import utime
+from subprocess import Popen
+import sys
+from pathlib import Path
+from time import time
+import weakref
+
+import pytest
+
+import lib.logger
+from lib.logger import DURABILITY, LOG_LEVEL, CrashLogFile, FileAutoSave, ConcurrentLogFile, FileHandler, LogFile, Logger, RingBufferHandler, RotatingLogFile
+
+
+def _crash_logs(tmp_path: Path) -> list[str]:
+    return sorted(p.name for p in tmp_path.glob("crash_*.log"))
+
+
+def _write_crash_log(tmp_path: Path, **kwargs) -> None:
+    crash_log = CrashLogFile(str(tmp_path / "crash_"), ".log", init_message=False, **kwargs)
+    crash_log.write("crash\n")
+    crash_log.close()
+
+
+def _existing(tmp_path: Path, count: int, size: int = 1) -> None:
+    for num in range(1, count + 1):
+        (tmp_path / f"crash_{num:03}.log").write_text("x" * size)
+
+
+def test_crash_log_numbering(tmp_path: Path):
+    _existing(tmp_path, 2)
+    _write_crash_log(tmp_path)
+    (tmp_path / "crash_003.log").unlink()
+    # the index file continues the numbering even when the newest log is gone
+    _write_crash_log(tmp_path)
+    assert _crash_logs(tmp_path) == ["crash_001.log", "crash_002.log", "crash_004.log"]
+
+
+def test_crash_log_count_retention(tmp_path: Path):
+    # fewer logs than the limit are all kept
+    _existing(tmp_path, 3)
+    _write_crash_log(tmp_path, max_crash_logs=6)
+    assert _crash_logs(tmp_path) == ["crash_001.log", "crash_002.log", "crash_003.log", "crash_004.log"]
+
+    _existing(tmp_path, 6)
+    _write_crash_log(tmp_path, max_crash_logs=3)
+    assert _crash_logs(tmp_path) == ["crash_005.log", "crash_006.log", "crash_007.log"]
+
+    _write_crash_log(tmp_path, max_crash_logs=1)
+    assert _crash_logs(tmp_path) == ["crash_008.log"]
+
+
+def test_crash_log_age_retention(tmp_path: Path):
+    _existing(tmp_path, 3)
+    t_old = time() - 3 * 24 * 3600
+    utime(tmp_path / "crash_001.log", (t_old, t_old))
+    utime(tmp_path / "crash_003.log", (t_old, t_old))
+    _write_crash_log(tmp_path, max_age=timedelta(days=1))
+    assert _crash_logs(tmp_path) == ["crash_002.log", "crash_004.log"]
+
+
+def test_crash_log_size_retention(tmp_path: Path):
+    _existing(tmp_path, 4, size=100)
+    _write_crash_log(tmp_path, max_total_size=250)
+    # the oldest logs go first, the new log is never removed
+    assert _crash_logs(tmp_path) == ["crash_003.log", "crash_004.log", "crash_005.log"]
+
+
+def test_crash_log_concurrent_allocation(tmp_path: Path):
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: _write_crash_log(tmp_path), range(16)))
+    assert _crash_logs(tmp_path) == [f"crash_{num:03}.log" for num in range(1, 17)]
+    assert all(p.read_text() == "crash\n" for p in tmp_path.glob("crash_*.log"))
+
+
+@pytest.mark.parametrize("durability", list(DURABILITY))
+def test_file_auto_save_durability(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, durability: DURABILITY):
+    t_fsyncs: list[int] = []
+    monkeypatch.setattr(lib.logger, "fsync", t_fsyncs.append)
+    file = FileAutoSave(str(tmp_path / "log.txt"), durability=durability, group_commit_interval_ms=60000, group_commit_bytes=10)
+    file.write("1234")
+    # every policy flushes, so other readers see the write at once
+    assert (tmp_path / "log.txt").read_text() == "1234"
+    assert len(t_fsyncs) == (1 if durability == DURABILITY.ALWAYS else 0)
+    file.write("567890")
+    # group commit syncs once group_commit_bytes are pending
+    assert len(t_fsyncs) == {DURABILITY.ALWAYS: 2, DURABILITY.GROUP_COMMIT: 1, DURABILITY.ON_CLOSE: 0}[durability]
+    file.close()
+    assert (tmp_path / "log.txt").read_text() == "1234567890"
+    assert len(t_fsyncs) == {DURABILITY.ALWAYS: 2, DURABILITY.GROUP_COMMIT: 1, DURABILITY.ON_CLOSE: 1}[durability]
+
+
+def test_async_handler_is_released_on_detach(tmp_path: Path):
+    handler = FileHandler(LogFile(str(tmp_path / "log.txt"), init_message=False), LOG_LEVEL.WARNING, format="%(message)s", async_mode=True)
+    # pytest's own handlers keep the root logger at WARNING
+    Logger("async").warning("queued")
+    handler.flush()
+    assert (tmp_path / "log.txt").read_text() == "queued\n"
+
+    t_root_handler = weakref.ref(handler._root_handler)
+    handler.detach().close()
+    del handler
+    gc.collect()
+    # the atexit hook of the async handler must not keep it and its writer thread alive
+    assert t_root_handler() is None
+
+
+def test_ring_buffer_spills_only_on_error(tmp_path: Path):
+    crash_log = CrashLogFile(str(tmp_path / "crash_"), ".log", init_message=False)
+    handler = RingBufferHandler(crash_log, LOG_LEVEL.WARNING, capacity=2, format="%(message)s")
+    logger = Logger("ring")
+    try:
+        for num in range(3):
+            logger.warning("warning %s", num)
+        assert _crash_logs(tmp_path) == [] and handler.dump() == str(tmp_path / "crash_001.log")
+        # the oldest record was overwritten
+        assert (tmp_path / "crash_001.log").read_text() == "warning 1\nwarning 2\n"
+
+        logger.error("error")
+        assert (tmp_path / "crash_001.log").read_text() == "warning 1\nwarning 2\nerror\n"
+    finally:
+        handler.detach().close()
+
+    handler = RingBufferHandler(CrashLogFile(str(tmp_path / "unused_"), ".log"), LOG_LEVEL.WARNING)
+    assert handler.dump() is None
+    handler.detach().close()
+
+
+def test_log_file_appends(tmp_path: Path):
+    file = LogFile(str(tmp_path / "log.txt"), init_message=False, blank_lines=2)
+    file.write("first\n")
+    file.close()
+
+    file = LogFile(str(tmp_path / "log.txt"), init_message=False, blank_lines=2)
+    file.write("second\n")
+    file.close()
+    assert (tmp_path / "log.txt").read_text() == "first\n\n\nsecond\n"
+
+    LogFile(str(tmp_path / "log.txt"), init_message=False, clear_logfile=True).close()
+    assert (tmp_path / "log.txt").read_text() == ""
+
+
+def test_rotating_log_file(tmp_path: Path):
+    file = RotatingLogFile(str(tmp_path / "log.txt"), max_bytes=10, max_backups=2, init_message=False)
+    for line in ("aaaaaaaa\n", "bbbbbbbb\n", "cccccccc\n", "dddddddd\n"):
+        file.write(line)
+    file.close()
+    # the oldest segment is dropped, the others are compressed in the background
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["log.txt", "log.txt.1.gz", "log.txt.2.gz"]
+    assert (tmp_path / "log.txt").read_text() == "dddddddd\n"
+    assert gzip.decompress((tmp_path / "log.txt.1.gz").read_bytes()) == b"cccccccc\n"
+    assert gzip.decompress((tmp_path / "log.txt.2.gz").read_bytes()) == b"bbbbbbbb\n"
+
+
+@pytest.fixture
+def log_file(tmp_path: Path):
+    handler = FileHandler(LogFile(str(tmp_path / "handler.log"), init_message=False), LOG_LEVEL.ERROR, format="%(levelname)s %(message)s")
+    yield tmp_path / "handler.log"
+    handler.detach().close()
+
+
+def test_disabled_levels_cost_nothing(log_file: Path):
+    t_calls: list[str] = []
+
+    def message(text: str):
+        return lambda: t_calls.append(text) or text
+
+    logger = Logger("gating")
+    logger.warning(message("below the handler level"))
+    logger.error(message("lazy %s"))
+    logger.error("args %s", 1)
+    # only the accepted record builds its message, the lazy one is taken as is
+    assert t_calls == ["lazy %s"]
+    assert log_file.read_text() == "ERROR lazy %s\nERROR args 1\n"
+
+
+def test_print_is_raw_and_thread_safe(log_file: Path):
+    logger = Logger("print")
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda num: logger.print(f"raw {num}") if num % 2 else logger.error(f"formatted {num}"), range(40)))
+    logger.print("below the handler", simulated_loglevel=LOG_LEVEL.WARNING)
+
+    lines = log_file.read_text().splitlines()
+    # printing never swaps the formatter of the handler, records logged meanwhile keep their format
+    assert sorted(lines) == sorted([f"raw {n}" for n in range(1, 40, 2)] + [f"ERROR formatted {n}" for n in range(0, 40, 2)])
+
+
+CONCURRENT_WRITER = """
+import sys
+sys.path.insert(0, sys.argv[3])
+from lib.logger import DURABILITY, ConcurrentLogFile
+file = ConcurrentLogFile(sys.argv[1], blank_lines=0, init_message=False, lock=True, durability=DURABILITY.ON_CLOSE)
+for num in range(200):
+    file.write(f"{sys.argv[2]} {num} " + "x" * 500 + "\\n")
+file.close()
+"""
+
+
+def test_concurrent_log_file_from_processes(tmp_path: Path):
+    (tmp_path / "writer.py").write_text(CONCURRENT_WRITER, encoding="utf-8")
+    t_src = str(Path(lib.logger.__file__).parents[1])
+    processes = [Popen([sys.executable, str(tmp_path / "writer.py"), str(tmp_path / "log.txt"), str(writer), t_src]) for writer in range(4)]
+    assert [p.wait() for p in processes] == [0] * 4
+    lines = (tmp_path / "log.txt").read_text().splitlines()
+    # every record arrives whole, the records of one process in order
+    assert sorted(lines) == sorted(f"{writer} {num} " + "x" * 500 for writer in range(4) for num in range(200))
+    for writer in range(4):
+        assert [int(line.split()[1]) for line in lines if line.startswith(f"{writer} ")] == list(range(200))
+
+
+def test_concurrent_log_file_completes_short_writes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    os_write = lib.logger.os_write
+
+    def short_write(fd: int, data: memoryview) -> int:
+        return os_write(fd, data[:3])
+
+    file = ConcurrentLogFile(str(tmp_path / "log.txt"), init_message=False, lock=False)
+    monkeypatch.setattr(lib.logger, "os_write", short_write)
+    file.write("a record longer than one write\n")
+    file.close()
+    assert (tmp_path / "log.txt").read_text() == "a record longer than one write\n"
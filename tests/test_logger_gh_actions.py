@@ -0,0 +1,36 @@
+from __future__ import annotations
+from io import StringIO
+from time import sleep
+
+from lib.logger_gh_actions import _BufferedWriter, _command, escape_data
+
+
+def test_workflow_commands_are_escaped():
+    assert escape_data("100% done\r\nnext") == "100%25 done%0D%0Anext"
+    # the record's own line break ends the command, inner ones are escaped
+    assert _command("error", "first\nsecond\n") == "::error::first%0Asecond\n"
+
+
+def test_buffered_writer_keeps_the_stream_order():
+    stdout, stderr = StringIO(), StringIO()
+    writer = _BufferedWriter(max_buffer_size=10, max_delay=60)
+    writer.write(stdout, "a\n")
+    writer.write(stdout, "b\n")
+    assert stdout.getvalue() == ""
+
+    # switching the stream writes what the other stream buffered first
+    writer.write(stderr, "c\n")
+    assert stdout.getvalue() == "a\nb\n" and stderr.getvalue() == ""
+    writer.write(stderr, "0123456789")
+    assert stderr.getvalue() == "c\n0123456789"
+
+
+def test_buffered_writer_flushes_after_max_delay():
+    stdout = StringIO()
+    writer = _BufferedWriter(max_delay=0.01)
+    writer.write(stdout, "a\n")
+    for _ in range(200):
+        if stdout.getvalue() != "":
+            break
+        sleep(0.01)
+    assert stdout.getvalue() == "a\n"
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from requirements_diff import find_missing_requirements, parse_requirements_include, read_requirements, requirement_names, unpinned_requirements
+
+
+def _install(site: Path, name: str, version: str, requires: tuple[str, ...] = ()) -> None:
+    dist_info = site / f"{name}-{version}.dist-info"
+    dist_info.mkdir()
+    metadata = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"] + [f"Requires-Dist: {r}" for r in requires]
+    (dist_info / "METADATA").write_text("\n".join(metadata) + "\n", encoding="utf-8")
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    site = tmp_path / "site-packages"
+    site.mkdir()
+    _install(site, "Foo_Bar", "1.2.0")
+    _install(site, "requests", "2.31.0", ('charset-normalizer<4,>=2', 'PySocks!=1.5.7,>=1.5.6; extra == "socks"'))
+    _install(site, "charset-normalizer", "3.3.2")
+    return site
+
+
+def _missing(site: Path, *requirements: str) -> list[str]:
+    return find_missing_requirements(list(requirements), search_path=[str(site)])
+
+
+def test_version_specifiers(site: Path):
+    assert _missing(site, "foo-bar>=1.0", "foo-bar==1.2.0") == []
+    assert _missing(site, "foo-bar>=2") == ["foo-bar>=2"]
+    assert _missing(site, "missing-package") == ["missing-package"]
+
+
+def test_names_are_canonicalized(site: Path):
+    assert _missing(site, "Foo.Bar", "FOO_BAR~=1.2", "Charset_Normalizer") == []
+
+
+def test_markers(site: Path):
+    assert _missing(site, 'missing-package; python_version < "3"') == []
+    assert _missing(site, 'missing-package; python_version >= "3"') == ['missing-package; python_version >= "3"']
+
+
+def test_extras_need_their_dependencies(site: Path):
+    assert _missing(site, "requests") == []
+    assert _missing(site, "requests[socks]") == ["requests[socks]"]
+    _install(site, "PySocks", "1.7.1")
+    assert _missing(site, "requests[socks]") == []
+
+
+def test_urls_hashes_and_invalid_lines(site: Path):
+    assert _missing(site, "foo-bar @ https://example.com/foo_bar-1.2.0.tar.gz") == ["foo-bar @ https://example.com/foo_bar-1.2.0.tar.gz"]
+    assert _missing(site, "foo-bar==1.2.0 --hash=sha256:abc") == []
+    assert _missing(site, "not a requirement") == ["not a requirement"]
+
+
+@pytest.mark.parametrize("line, include", [
+    ("-r base.txt", "base.txt"),
+    ("-rbase.txt", "base.txt"),
+    ("--requirement=base.txt", "base.txt"),
+    ("--constraint base.txt", "base.txt"),
+    ("--requirementbase.txt", None),
+    ("requests", None),
+])
+def test_parse_requirements_include(line: str, include: str | None):
+    assert parse_requirements_include(line) == include
+
+
+def test_read_requirements_resolves_includes(tmp_path: Path):
+    (tmp_path / "base.txt").write_text("Foo_Bar>=1  # comment\n-r requirements.txt\n", encoding="utf-8")
+    (tmp_path / "constraints.txt").write_text("foo-bar<2\n", encoding="utf-8")
+    (tmp_path / "requirements.txt").write_text(
+        "# comment\n-r base.txt\n-c constraints.txt\n--index-url https://example.com\nrequests[socks] \\\n  >=2\n", encoding="utf-8")
+
+    requirements, options = read_requirements(str(tmp_path / "requirements.txt"))
+    assert requirements == ["Foo_Bar>=1", "requests[socks]   >=2"]
+    assert options == [f'--constraint "{tmp_path / "constraints.txt"}"', "--index-url https://example.com"]
+    assert requirement_names(str(tmp_path / "requirements.txt")) == {"foo-bar", "requests"}
+
+
+def test_unpinned_requirements(tmp_path: Path):
+    (tmp_path / "constraints.txt").write_text("requests==2.32.3\n", encoding="utf-8")
+    (tmp_path / "requirements.txt").write_text(
+        "-c constraints.txt\nFoo_Bar==1.0\nbaz==1.*\nrequests>=2\nqux @ https://example.com/qux.whl\n-e ./local\n", encoding="utf-8")
+    assert unpinned_requirements(str(tmp_path / "requirements.txt"), ("pyinstaller", "foo-bar")) == ["baz", "pyinstaller"]
+    assert unpinned_requirements("", ("pyinstaller",)) == ["pyinstaller"]
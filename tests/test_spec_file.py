@@ -0,0 +1,95 @@
+from __future__ import annotations
+import sys
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+from spec_file import PHASE_ENV, TARGET_ENV, SpecError, Target, makespec_options, read_spec_constants, render_spec
+
+
+def _values(**values: Any) -> dict[str, Any]:
+    return {"output-path": "dist", "onefile": True, "no-console": False, "paths": [], "additional-data": [], "hidden-imports": [],
+            "exclude-modules": [], "optimize": "0", "strip": False, "upx": False, "upx-exclude": [], "onefile-compression-level": "",
+            **values}
+
+
+class _Stub:
+    calls: list[tuple[str, dict[str, Any]]] = []
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        self.calls.append((type(self).__name__, kwargs))
+        self.pure = self.scripts = self.binaries = self.datas = []
+
+
+def _execute(spec: str, stubs: dict[str, Any] | None = None) -> list[tuple[str, dict[str, Any]]]:
+    _Stub.calls = []
+    exec(spec, stubs if stubs is not None else {name: type(name, (_Stub,), {}) for name in ("Analysis", "PYZ", "EXE", "COLLECT")})
+    return _Stub.calls
+
+
+def test_render_spec_is_deterministic():
+    targets = [Target("b.py", "b", ""), Target("a.py", "a", "a.ico")]
+    first = render_spec(targets, _values(**{"hidden-imports": ["y", "x", "y"], "paths": ["p2", "p1"],
+                                             "additional-data": [("d2", "."), ("d1", "data")]}))
+    second = render_spec(targets[::-1], _values(**{"hidden-imports": ["x", "y"], "paths": ["p2", "p1"],
+                                                    "additional-data": [("d1", "data"), ("d2", ".")]}))
+    assert first == second
+    constants = read_spec_constants(first, ("TARGETS", "PATHEX", "HIDDEN_IMPORTS"))
+    assert list(constants["TARGETS"]) == ["a", "b"]
+    assert constants["PATHEX"] == ["p2", "p1"]
+    assert constants["HIDDEN_IMPORTS"] == ["x", "y"]
+
+
+def test_spec_builds_every_target():
+    calls = _execute(render_spec([Target("a.py", "a", ""), Target("b.py", "b", "")], _values(onefile=False)))
+    assert [name for name, _ in calls] == ["Analysis", "PYZ", "EXE", "COLLECT"] * 2
+    # optimize needs pyinstaller 6.6, it is only passed when set
+    assert "optimize" not in calls[0][1]
+
+    calls = _execute(render_spec([Target("a.py", "a", "")], _values(optimize="2", strip=True)))
+    assert [name for name, _ in calls] == ["Analysis", "PYZ", "EXE"]
+    assert calls[0][1]["optimize"] == 2
+    assert calls[2][1]["strip"] is True
+
+
+@pytest.mark.parametrize("supported", [True, False])
+def test_spec_compression_level(monkeypatch: pytest.MonkeyPatch, supported: bool):
+    writers = ModuleType("PyInstaller.archive.writers")
+    writers.CArchiveWriter = type("CArchiveWriter", (), {"_COMPRESSION_LEVEL": 6} if supported else {})  # type: ignore[attr-defined]
+    for name, module in {"PyInstaller": ModuleType("PyInstaller"), "PyInstaller.archive": ModuleType("PyInstaller.archive"),
+                         "PyInstaller.archive.writers": writers}.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+    spec = render_spec([Target("a.py", "a", "")], _values(**{"onefile-compression-level": "9"}))
+    if supported:
+        _execute(spec)
+        assert writers.CArchiveWriter._COMPRESSION_LEVEL == 9  # type: ignore[attr-defined]
+    else:
+        # a pyinstaller without the class attribute would silently ignore the level
+        with pytest.raises(SystemExit, match="onefile-compression-level is not supported"):
+            _execute(spec)
+
+
+def test_spec_phases(monkeypatch: pytest.MonkeyPatch):
+    spec = render_spec([Target("a.py", "a", ""), Target("b.py", "b", "")], _values())
+    monkeypatch.setenv(PHASE_ENV, "analyze")
+    assert [name for name, _ in _execute(spec)] == ["Analysis", "Analysis"]
+
+    # the bundling process of b numbers its analysis like the analyze run did
+    monkeypatch.delenv(PHASE_ENV)
+    monkeypatch.setenv(TARGET_ENV, "b")
+    stubs: dict[str, Any] = {name: type(name, (_Stub,), {}) for name in ("Analysis", "PYZ", "EXE", "COLLECT")}
+    assert [name for name, _ in _execute(spec, stubs)] == ["Analysis", "PYZ", "EXE"]
+    assert stubs["Analysis"].invcnum == 1
+
+
+def test_read_spec_constants_reports_missing_names():
+    with pytest.raises(SpecError, match="does not define DISTPATH"):
+        read_spec_constants("TARGETS = {}\n", ("TARGETS", "DISTPATH"))
+
+
+def test_makespec_options():
+    assert makespec_options(["--clean", "--log-level=WARN", "-y", "--upx-dir", "C:\\upx"]) == []
+    assert makespec_options(["--collect-all=numpy", "-Fw", "--icon", "x.ico"]) == [
+        ("--collect-all=numpy", "--collect-all"), ("-Fw", "-F"), ("--icon", "--icon")]
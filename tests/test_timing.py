@@ -0,0 +1,52 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from lib.logger import Logger, clear_spans, get_spans
+from timing import TimingError, append_spans, begin_span, end_span, load_timing_file, timing_markdown
+
+
+pytestmark = pytest.mark.filterwarnings("ignore:Logger hat keine Handler")
+
+
+def test_logger_spans_nest():
+    clear_spans()
+    logger = Logger("timing")
+
+    @logger.span("inner")
+    def inner() -> None:
+        pass
+
+    with logger.span("outer"):
+        inner()
+        inner()
+    spans = get_spans()
+    assert [(s.name, s.depth, s.parent.name if s.parent else None) for s in spans] == [("outer", 0, None), ("inner", 1, "outer"), ("inner", 1, "outer")]
+    assert all(s.duration is not None and s.duration >= 0 for s in spans)
+    clear_spans()
+
+
+def test_timing_file_spans(tmp_path: Path):
+    clear_spans()
+    timing_file = str(tmp_path / "timing.json")
+    with Logger("timing").span("parse"):
+        pass
+    append_spans(timing_file, get_spans(), "input parser", clear=True)
+    clear_spans()
+
+    # spans of later steps are nested below the spans the action script left open
+    begin_span(timing_file, "pyinstaller")
+    with Logger("timing").span("build a"):
+        pass
+    append_spans(timing_file, get_spans(), "build")
+    clear_spans()
+    assert end_span(timing_file, "pyinstaller") >= 0
+    with pytest.raises(TimingError, match="span missing was not started"):
+        end_span(timing_file, "missing")
+
+    records = load_timing_file(timing_file)
+    assert [(r["name"], r["source"], r["depth"], r["parent"]) for r in records] == [
+        ("parse", "input parser", 0, None), ("pyinstaller", "action", 0, None), ("build a", "build", 1, "pyinstaller")]
+    markdown = timing_markdown(records).splitlines()
+    assert len(markdown) == 5 and markdown[4].startswith("| &nbsp;&nbsp;&nbsp;&nbsp;build a | ")